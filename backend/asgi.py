@@ -0,0 +1,208 @@
+"""ASGI entry point for serving many slow clients from one process.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+``/api/video/info``, job progress events and ``/api/video/stream/<filename>``
+are async handlers here: a waiting client costs a coroutine, not a thread.
+Blocking yt-dlp extraction runs on a bounded executor
+(``ASGI_EXTRACT_WORKERS``) and file reads on a small one, so concurrency is
+capped by work, not by connections. Every other route is the Flask app from
+``main.py`` mounted through a2wsgi. Needs ``starlette``, ``a2wsgi`` and an
+ASGI server such as ``uvicorn``; the gunicorn deployment does not.
+"""
+import asyncio
+import json
+import math
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_accept_header, parse_date, parse_etags, parse_if_range_header, parse_range_header
+
+from main import app as flask_app
+from routes import video_enhanced as video
+from services.compression import COMPRESS_MIN_SIZE, ENCODERS, negotiate
+from services.ratelimit import RATE_LIMITED, client_key
+from services.streaming import BLOCK_SIZE, plan_file_response
+
+# Threads for blocking yt-dlp calls; the cap on concurrent extractions
+extract_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASGI_EXTRACT_WORKERS", 16)),
+    thread_name_prefix="asgi-extract",
+)
+# Threads for disk reads and other short blocking calls
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASGI_IO_WORKERS", 8)),
+    thread_name_prefix="asgi-io",
+)
+# Threads a2wsgi uses to run the mounted Flask app
+WSGI_WORKERS = int(os.environ.get("ASGI_WSGI_WORKERS", 32))
+
+
+async def _run(executor, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def _load_info(url):
+    # The info cache's database tier needs the Flask app context
+    with flask_app.app_context():
+        return video._with_thumbnail(video.info_cache.get(url, video._extract_info))
+
+
+def _json(request, data, status=200, headers=None):
+    """JSON via the app's provider (orjson when installed), compressed like
+    the Flask routes are"""
+    body = flask_app.json.dumps(data).encode()
+    headers = dict(headers or {})
+    if len(body) >= COMPRESS_MIN_SIZE:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(parse_accept_header(request.headers.get("accept-encoding")))
+        if encoding is not None:
+            body = ENCODERS[encoding](body)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status, headers, media_type="application/json")
+
+
+def _error(request, message, status, retry_after=None):
+    if retry_after is None:
+        return _json(request, {"error": message}, status)
+    retry_after = max(1, math.ceil(retry_after))
+    return _json(request, {"error": message, "retry_after": retry_after}, status,
+                 {"Retry-After": str(retry_after)})
+
+
+async def _rate_limited(request, name):
+    client = client_key(request.headers, request.client.host if request.client else None)
+    wait = await _run(io_executor, video.rate_limiter.retry_after, name, client)
+    return None if wait is None else _error(request, RATE_LIMITED, 429, retry_after=wait)
+
+
+# Get video info (async twin of video_enhanced.get_video_info)
+async def video_info(request):
+    rejected = await _rate_limited(request, "extract")
+    if rejected:
+        return rejected
+    reason = video.load_shedder.admit()
+    if reason is not None:
+        return _error(request, reason, 503, retry_after=video.load_shedder.retry_after)
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        url = data.get("url") if isinstance(data, dict) else None
+        if not url:
+            return _error(request, "URL is required", 400)
+        try:
+            info = await _run(extract_executor, _load_info, url)
+        except Exception as e:
+            return _error(request, str(e), 500)
+        return _json(request, info)
+    finally:
+        video.load_shedder.release()
+
+
+# Download job progress as Server-Sent Events, polled without holding a thread
+async def job_events(request):
+    job = video.download_queue.get(request.path_params["job_id"])
+    if job is None:
+        return _error(request, "Job not found", 404)
+
+    async def generate():
+        version, idle = None, 0.0
+        while True:
+            if job.version != version:
+                version = job.version
+                yield f"id: {version}\nevent: progress\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+                idle = 0.0
+            elif idle >= video.SSE_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(job.event_interval)
+            idle += job.event_interval
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+async def _file_chunks(path, start, length):
+    f = await _run(io_executor, open, path, "rb")
+    try:
+        await _run(io_executor, f.seek, start)
+        while length > 0:
+            chunk = await _run(io_executor, f.read, min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+# Stream/serve file with the same Range and conditional handling as the WSGI route
+async def stream_file(request):
+    filename = request.path_params["filename"]
+    try:
+        path = video.storage.path_for(filename)
+    except ValueError:
+        return _error(request, "File not found", 404)
+    if not os.path.exists(path):
+        return _error(request, "File not found", 404)
+    await _run(io_executor, video.storage.touch, filename)
+
+    if video.STREAM_OFFLOAD:
+        offloaded = video._offload_file(path)
+        return Response(status_code=offloaded.status_code, headers=dict(offloaded.headers))
+
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    headers = request.headers
+    status, response_headers, start, end, _ = plan_file_response(
+        path,
+        parse_etags(headers.get("if-none-match")),
+        parse_date(headers.get("if-modified-since")),
+        parse_range_header(headers.get("range")),
+        parse_if_range_header(headers.get("if-range")),
+    )
+    if status in (304, 416) or request.method == "HEAD":
+        return Response(status_code=status, headers=response_headers,
+                        media_type=None if status in (304, 416) else mimetype)
+    return StreamingResponse(_file_chunks(path, start, end - start), status_code=status,
+                             headers=response_headers, media_type=mimetype)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Async routes never reach Flask's before_app_request hook
+    video.storage.start(flask_app)
+    video.thumbnail_storage.start(flask_app)
+    yield
+    extract_executor.shutdown(wait=False, cancel_futures=True)
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    video.transcoder.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/api/video/info", video_info, methods=["POST"]),
+        Route("/api/video/jobs/{job_id}/events", job_events, methods=["GET"]),
+        Route("/api/video/stream/{filename}", stream_file, methods=["GET", "HEAD"]),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=WSGI_WORKERS)),
+    ],
+    # The async routes never reach flask-cors, so answer CORS for every
+    # route here, allowing any origin like CORS(app) in main.py does
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"],
+                           allow_headers=["*"])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,79 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import yt_dlp
+
+HEIGHTS = (240, 360, 480, 720, 1080)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class MediaServer:
+    """Serves a generated ``clip.mp4`` of ``size`` random bytes on 127.0.0.1"""
+
+    def __init__(self, root, size):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, "clip.mp4")
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+        handler = functools.partial(_QuietHandler, directory=root)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/clip.mp4"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fake_ydl_factory(media_url, extract_delay=0.0):
+    """YoutubeDL factory for ``YDLPool`` that never leaves the machine.
+
+    Extraction returns a synthetic video with one muxed format per height,
+    all pointing at ``media_url``, after sleeping ``extract_delay`` seconds
+    to stand in for the site round trips. Everything after extraction
+    (format selection, the HTTP downloader, hooks) is real yt-dlp.
+    """
+    class FakeYoutubeDL(yt_dlp.YoutubeDL):
+        def extract_info(self, url, download=True, ie_key=None, extra_info=None,
+                         process=True, force_generic_extractor=False):
+            if extract_delay:
+                threading.Event().wait(extract_delay)
+            video_id = url.rsplit("=", 1)[-1]
+            info = {
+                "id": video_id,
+                "title": f"Benchmark video {video_id}",
+                "uploader": "bench",
+                "extractor": "fake",
+                "extractor_key": "Fake",
+                "webpage_url": url,
+                "original_url": url,
+                "duration": 60,
+                "view_count": 1,
+                "thumbnail": None,
+                "formats": [{
+                    "format_id": str(height),
+                    "url": media_url,
+                    "protocol": "http",
+                    "ext": "mp4",
+                    "width": height * 16 // 9,
+                    "height": height,
+                    "vcodec": "avc1.64001f",
+                    "acodec": "mp4a.40.2",
+                    "tbr": height * 2,
+                } for height in HEIGHTS],
+            }
+            return self.process_ie_result(info, download=download) if process else info
+
+    return FakeYoutubeDL
@@ -0,0 +1,368 @@
+"""Load benchmark for the video, user and blog endpoints.
+
+Boots the app from ``main.py`` in-process against a fake yt-dlp extractor
+and a local media server, so no request leaves the machine. Each endpoint
+is first driven alone (to attribute latency and RSS to it), then all of
+them together as a weighted mix. Run from ``backend/``::
+
+    python -m bench.run --duration 10 --concurrency 8
+    python -m bench.run --save-baseline main
+    python -m bench.run --compare main
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+DEFAULT_MIX = "info=3,download=1,stream=2,users_list=2,users_get=3,users_create=1,users_update=1,blog_list=2"
+
+
+def rss_mb():
+    """Current resident set size; the load generator shares the process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Client:
+    """One HTTP/1.1 connection per worker thread, reopened when the server closes it"""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            start = time.perf_counter()
+            try:
+                self.conn.request(method, path, body, headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+                continue
+            elapsed = time.perf_counter() - start
+            if response.will_close:
+                self.conn.close()
+                self.conn = None
+            return response.status, data, elapsed
+
+
+class Workload:
+    """Scenario implementations; each returns ``[(name, seconds, ok), ...]``"""
+
+    def __init__(self, state, videos):
+        self.state = state
+        self.videos = videos
+        self._counter = iter(range(10 ** 9))
+        self._lock = threading.Lock()
+
+    def _unique(self):
+        with self._lock:
+            return next(self._counter)
+
+    def _video_url(self, rng):
+        return f"https://bench.invalid/watch?v=vid{rng.randrange(self.videos)}"
+
+    def info(self, client, rng):
+        status, _, elapsed = client.request("POST", "/api/video/info", {"url": self._video_url(rng)})
+        return [("info", elapsed, status == 200)]
+
+    def download(self, client, rng):
+        start = time.perf_counter()
+        status, data, elapsed = client.request(
+            "POST", "/api/video/download", {"url": self._video_url(rng), "quality": "360p"})
+        results = [("download", elapsed, status in (200, 202))]
+        if status == 202:
+            status_url = json.loads(data)["status_url"]
+            while True:
+                status, data, _ = client.request("GET", status_url)
+                job = json.loads(data) if status == 200 else {}
+                if job.get("status") not in ("queued", "running"):
+                    break
+                time.sleep(0.02)
+            results.append(("download_e2e", time.perf_counter() - start, job.get("status") == "done"))
+        return results
+
+    def stream(self, client, rng):
+        headers = {"Range": "bytes=0-65535"} if rng.random() < 0.3 else None
+        status, _, elapsed = client.request("GET", self.state["stream_path"], headers=headers)
+        return [("stream", elapsed, status in (200, 206))]
+
+    def users_list(self, client, rng):
+        cursor = rng.randrange(self.state["users"])
+        status, _, elapsed = client.request("GET", f"/api/users?limit=50&cursor={cursor}")
+        return [("users_list", elapsed, status == 200)]
+
+    def users_get(self, client, rng):
+        user_id = rng.choice(self.state["user_ids"])
+        status, _, elapsed = client.request("GET", f"/api/users/{user_id}")
+        return [("users_get", elapsed, status == 200)]
+
+    def users_create(self, client, rng):
+        n = self._unique()
+        status, _, elapsed = client.request(
+            "POST", "/api/users", {"username": f"bench-new-{n}", "email": f"bench-new-{n}@example.com"})
+        return [("users_create", elapsed, status == 201)]
+
+    def users_update(self, client, rng):
+        user_id = rng.choice(self.state["user_ids"])
+        status, _, elapsed = client.request(
+            "PUT", f"/api/users/{user_id}", {"email": f"bench-upd-{self._unique()}@example.com"})
+        return [("users_update", elapsed, status == 200)]
+
+    def blog_list(self, client, rng):
+        status, _, elapsed = client.request("GET", "/api/blog/posts?limit=12")
+        return [("blog_list", elapsed, status == 200)]
+
+
+def boot(args, workdir):
+    """Import the app with bench settings and serve it on a local port"""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("DOWNLOAD_DIR", os.path.join(workdir, "downloads"))
+    os.environ.setdefault("THUMBNAIL_DIR", os.path.join(workdir, "thumbnails"))
+    # The harness is one client on one address: rate limits would dominate
+    os.environ.setdefault("RATE_LIMIT_EXTRACT", "")
+    os.environ.setdefault("RATE_LIMIT_DOWNLOAD", "")
+    sys.path.insert(0, BACKEND_DIR)
+
+    from bench.fake_media import MediaServer, fake_ydl_factory
+    from werkzeug.serving import make_server
+
+    media = MediaServer(os.path.join(workdir, "media"), args.media_size).start()
+
+    import main
+    from routes import video_enhanced
+
+    video_enhanced.ydl_pool.factory = fake_ydl_factory(media.url, args.extract_delay)
+    main.init_db(main.app)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, media
+
+
+def seed(client, args):
+    """Users, blog posts and one finished download for the read scenarios"""
+    state = {"users": args.users}
+    rows = [{"username": f"bench-{i}", "email": f"bench-{i}@example.com"} for i in range(args.users)]
+    _, data, _ = client.request("POST", "/api/users/bulk", rows)
+    state["user_ids"] = [row["id"] for row in map(json.loads, data.splitlines()) if "id" in row]
+
+    for i in range(50):
+        client.request("POST", "/api/blog/posts", {
+            "title": f"Bench post {i}", "content": "Lorem ipsum " * 200,
+            "author": "bench", "tags": "bench, load", "is_published": True})
+
+    status, data, _ = client.request(
+        "POST", "/api/video/download", {"url": "https://bench.invalid/watch?v=seed", "quality": "360p"})
+    job = json.loads(data)
+    status_url = job.get("status_url")
+    while job.get("status") in ("queued", "running"):
+        time.sleep(0.05)
+        job = json.loads(client.request("GET", status_url)[1])
+    if job.get("status") != "done":
+        raise SystemExit(f"seed download failed: {job}")
+    state["stream_path"] = job["download_url"]
+    return state
+
+
+def drive(port, workload, mix, duration, concurrency, seed):
+    """Run weighted scenarios from ``concurrency`` threads for ``duration`` seconds"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.perf_counter() + duration
+    samples = []
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(port)
+        local = []
+        while time.perf_counter() < deadline:
+            scenario = getattr(workload, rng.choices(names, weights)[0])
+            try:
+                local.extend(scenario(client, rng))
+            except Exception as e:
+                local.append(("error:" + type(e).__name__, 0.0, False))
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    stats = {}
+    for name in sorted({s[0] for s in samples}):
+        latencies = sorted(s[1] for s in samples if s[0] == name)
+        errors = sum(1 for s in samples if s[0] == name and not s[2])
+        stats[name] = {
+            "count": len(latencies),
+            "errors": errors,
+            "throughput": len(latencies) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        }
+    return stats
+
+
+def print_phase(phase, result):
+    print(f"\n== {phase}  ({result['elapsed']:.1f}s, rss {result['rss_mb']:.0f} MB, "
+          f"peak {result['peak_rss_mb']:.0f} MB)")
+    print(f"{'endpoint':<14}{'count':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, s in result["endpoints"].items():
+        print(f"{name:<14}{s['count']:>8}{s['errors']:>6}{s['throughput']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+def compare(results, baseline, threshold):
+    """Print per-endpoint deltas against ``baseline``; True if anything regressed"""
+    regressed = False
+    print(f"\n== compared with baseline ({threshold:.0%} tolerance)")
+    for phase, result in results["phases"].items():
+        base_phase = baseline["phases"].get(phase)
+        if base_phase is None:
+            continue
+        for name, s in result["endpoints"].items():
+            base = base_phase["endpoints"].get(name)
+            if base is None:
+                continue
+            p95 = s["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0
+            rps = s["throughput"] / base["throughput"] - 1 if base["throughput"] else 0
+            worse = p95 > threshold or rps < -threshold
+            regressed |= worse
+            print(f"{phase:<14}{name:<14} p95 {p95:+7.1%}  req/s {rps:+7.1%}"
+                  f"{'  REGRESSION' if worse else ''}")
+        rss = result["rss_mb"] / base_phase["rss_mb"] - 1 if base_phase["rss_mb"] else 0
+        if rss > threshold:
+            regressed = True
+            print(f"{phase:<14}{'rss':<14} {rss:+7.1%}  REGRESSION")
+    return regressed
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Workload, name.strip()):
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per phase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--phases", choices=("all", "isolated", "mixed"), default="all")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--videos", type=int, default=200, help="distinct fake video ids")
+    parser.add_argument("--extract-delay", type=float, default=0.05,
+                        help="simulated site latency per extraction, seconds")
+    parser.add_argument("--media-size", type=int, default=4 * 2 ** 20)
+    parser.add_argument("--workdir", help="keep the database and downloads here")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-")
+    server, media = boot(args, workdir)
+    mix = args.mix
+    try:
+        client = Client(server.server_port)
+        state = seed(client, args)
+        workload = Workload(state, args.videos)
+
+        phases = []
+        if args.phases in ("all", "isolated"):
+            phases += [(name, {name: 1}) for name in mix]
+        if args.phases in ("all", "mixed"):
+            phases.append(("mixed", mix))
+
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": {k: v for k, v in vars(args).items() if k not in ("output", "workdir")},
+            },
+            "phases": {},
+        }
+        for phase, phase_mix in phases:
+            samples, elapsed = drive(server.server_port, workload, phase_mix,
+                                     args.duration, args.concurrency, args.seed)
+            result = {
+                "elapsed": elapsed,
+                "rss_mb": rss_mb(),
+                "peak_rss_mb": peak_rss_mb(),
+                "endpoints": summarize(samples, elapsed),
+            }
+            results["phases"][phase] = result
+            print_phase(phase, result)
+    finally:
+        server.shutdown()
+        media.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nbaseline saved to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
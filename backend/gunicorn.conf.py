@@ -0,0 +1,28 @@
+"""gunicorn settings for the Procfile's ``web`` process.
+
+Several endpoints hold their connection for as long as the work runs: job
+progress over SSE (/jobs/<id>/events), the NDJSON batch endpoints
+(/info/batch, /download/batch) and stream-through downloads
+(/download/stream). On gunicorn's default sync worker each of those would
+occupy the only worker, stalling every other request, and get the worker
+killed after ``timeout`` seconds along with the in-memory download queue.
+
+The threaded worker gives each connection a thread instead, and its
+``timeout`` is a liveness check of the worker, not a per-request limit.
+There is a single worker process because download jobs, the /info cache
+and the rate limit buckets live in process memory; scale with threads
+(GUNICORN_THREADS) or run ``uvicorn asgi:app`` for many slow clients.
+
+Long responses are capped below the thread count so short requests always
+find a thread: SSE_MAX_STREAMS progress streams (a quarter of the threads
+by default) and SHED_MAX_INFLIGHT guarded requests (half). Beyond that
+they get a 503, and the frontend polls the job status instead.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+preload_app = True
+worker_class = "gthread"
+workers = 1
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
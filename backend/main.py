@@ -1,39 +1,125 @@
+import time
+
+_import_started = time.perf_counter()
+
 import os
-from flask import Flask, send_from_directory
+import click
+from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models.user import db
-from routes.video_enhanced import video_enhanced_bp  # import blueprint
+from services.assets import StaticAssets
+from services.compression import init_compression
+from services.database import configure_database
+from services.json_provider import init_json
+from services.metrics import init_metrics, registry
+
+_imported = time.perf_counter()
+
+startup_seconds = registry.gauge("app_startup_seconds", "Worker startup time by phase", ("phase",))
+
+
+def init_db(app):
+    """Create missing tables and the blog search index; run once per deploy,
+    not in every worker"""
+    from models.blog import create_search_index
+    with app.app_context():
+        db.create_all()
+        create_search_index()
+
+
+def _preload_yt_dlp(video_enhanced):
+    """Import yt-dlp and build a pooled instance now, so workers forked from
+    this process (gunicorn --preload) share it instead of each loading it"""
+    start = time.perf_counter()
+    video_enhanced.load_yt_dlp()
+    video_enhanced.ydl_pool.warm(video_enhanced.INFO_PROFILE)
+    return time.perf_counter() - start
+
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    Blueprints are imported here rather than at module level, and yt-dlp is
+    only imported on the first extraction unless YTDLP_PRELOAD=1. The
+    schema is no longer created on boot: run ``flask --app main init-db``
+    (the Procfile release step) or set DB_CREATE_ON_START=1.
+    """
+    started = time.perf_counter()
+    from models.blog import blog_bp
+    from routes import video_enhanced
+    from routes.user import user_bp
+    from routes.video_enhanced import video_enhanced_bp  # import blueprint
+
+    app = Flask(__name__,
+                static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    app.config.update(config or {})
+
+    # Number of reverse proxies in front of the app, so remote_addr is the client
+    proxy_hops = int(os.environ.get("PROXY_HOPS", 0))
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
+    # Enable CORS
+    CORS(app)
+
+    # Request timing, SQL and yt-dlp phase metrics, scraped from /metrics.
+    # Registered first so its after_request hook runs last and sees final sizes
+    init_metrics(app)
+
+    # orjson for jsonify when installed; compress large text responses
+    init_json(app)
+    init_compression(app)
+
+    # Register blueprints (⚡ notice: url_prefix only here, not in video_enhanced.py)
+    app.register_blueprint(video_enhanced_bp, url_prefix="/api/video")
+    app.register_blueprint(user_bp, url_prefix="/api")
+    app.register_blueprint(blog_bp)  # routes carry their own /blog and /api/blog paths
+
+    # Database setup
+    # DATABASE_URL switches backends; defaults to database/app.db in WAL mode
+    configure_database(app, db)
+    if os.environ.get("DB_CREATE_ON_START") == "1":
+        init_db(app)
+        # Don't hand this process's pooled connections to forked workers
+        with app.app_context():
+            db.engine.dispose()
 
-app = Flask(__name__,
-            static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create missing database tables."""
+        init_db(app)
+        click.echo("Database tables are up to date")
 
-# Enable CORS
-CORS(app)
+    # Frontend assets: STATIC_DIR, else the app's static folder, else the repo's frontend
+    static_dir = os.environ.get("STATIC_DIR") or next(
+        (d for d in (app.static_folder,
+                     os.path.join(os.path.dirname(__file__), "..", "frontend", "static"))
+         if os.path.isdir(d)), app.static_folder)
+    static_assets = StaticAssets(static_dir, auto_reload=os.environ.get("ASSET_RELOAD") == "1")
 
-# Register blueprints (⚡ notice: url_prefix only here, not in video_enhanced.py)
-app.register_blueprint(video_enhanced_bp, url_prefix="/api/video")
+    # Serve frontend (React/HTML) from the in-memory asset manifest
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def serve(path):
+        return static_assets.serve(path)
 
-# Database setup
-app.config[
-    'SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    timings = {"imports": _imported - _import_started,
+               "create_app": time.perf_counter() - started}
+    if os.environ.get("YTDLP_PRELOAD") == "1":
+        timings["ytdlp_preload"] = _preload_yt_dlp(video_enhanced)
+    for phase, seconds in timings.items():
+        startup_seconds.set(seconds, phase)
+    app.config["STARTUP_TIMINGS"] = timings
+    app.logger.info("Startup: %s", ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in timings.items()))
+    return app
 
 
-# Serve frontend (React/HTML)
-@app.route("/", defaults={"path": ""})
-@app.route("/<path:path>")
-def serve(path):
-    static_folder_path = app.static_folder
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        return send_from_directory(static_folder_path, "index.html")
+app = create_app()
 
 
 if __name__ == "__main__":
+    init_db(app)
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port, debug=True)
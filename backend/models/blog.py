@@ -1,12 +1,86 @@
-from flask import Blueprint, request, jsonify, render_template_string
+from flask import Blueprint, abort, current_app, make_response, request, jsonify
 from flask_cors import cross_origin
-from src.models.blog import BlogPost
-from src.models.user import db
+from models.user import db
+from services.compression import COMPRESS_MIN_SIZE, negotiate
+from collections import OrderedDict
 from datetime import datetime
+import base64
+import hashlib
+import json
 import os
+import threading
 
 blog_bp = Blueprint('blog', __name__)
 
+
+class BlogPost(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    author = db.Column(db.String(100), nullable=False)
+    excerpt = db.Column(db.String(500))
+    tags = db.Column(db.String(500))
+    is_published = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BlogPost {self.title}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'content': self.content,
+            'author': self.author,
+            'excerpt': self.excerpt,
+            'tags': [t.strip() for t in (self.tags or '').split(',') if t.strip()],
+            'is_published': self.is_published,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+
+# Backs the published listing; SQLite appends the rowid (id) to every index,
+# so this also serves the (created_at, id) keyset cursor
+db.Index('ix_blog_post_published_created', BlogPost.is_published, BlogPost.created_at)
+
+EXCERPT_LENGTH = 150
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Columns selectable through ?fields=; excerpt falls back to the start of the
+# content, cut in SQL so list views never load full bodies
+POST_FIELDS = {
+    'id': BlogPost.id,
+    'title': BlogPost.title,
+    'author': BlogPost.author,
+    'excerpt': db.func.coalesce(
+        db.func.nullif(BlogPost.excerpt, ''),
+        db.func.substr(BlogPost.content, 1, EXCERPT_LENGTH) + '...'),
+    'content': BlogPost.content,
+    'tags': BlogPost.tags,
+    'is_published': BlogPost.is_published,
+    'created_at': BlogPost.created_at,
+    'updated_at': BlogPost.updated_at,
+}
+LIST_FIELDS = ('id', 'title', 'author', 'excerpt', 'tags', 'created_at')
+LIST_PAGE_SIZE = 12
+SEARCH_PAGE_SIZE = 20
+
+
+class BlogTag(db.Model):
+    """Normalized tag; BlogPost.tags stays the display copy"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+
+
+blog_post_tags = db.Table(
+    'blog_post_tags',
+    db.Column('post_id', db.Integer, db.ForeignKey('blog_post.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('blog_tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+)
+
 # Blog listing page template
 BLOG_LIST_TEMPLATE = """
 <!DOCTYPE html>
@@ -133,12 +207,28 @@ BLOG_LIST_TEMPLATE = """
         </div>
 
         <div class="blog-grid" id="blogGrid">
-            <!-- Blog posts will be loaded here -->
+            {% for post in posts %}
+            <div class="blog-card">
+                <h3>{{ post.title }}</h3>
+                <div class="meta">
+                    By {{ post.author }} • {{ post.created_at.strftime('%B %d, %Y') }}
+                </div>
+                <div class="excerpt">{{ post.excerpt }}</div>
+                {% if post.tags %}
+                <div class="tags">
+                    {% for tag in post.tags %}<span class="tag">{{ tag }}</span>{% endfor %}
+                </div>
+                {% endif %}
+                <a href="/blog/post/{{ post.id }}" class="read-more">Read More →</a>
+            </div>
+            {% endfor %}
         </div>
 
-        <div class="no-posts" id="noPosts" style="display: none;">
+        <div class="no-posts" id="noPosts" style="display: {{ 'none' if posts else 'block' }};">
             <p>No blog posts yet. Be the first to create one!</p>
         </div>
+
+        <div id="loadMore" style="height: 1px;"></div>
     </div>
 
     <button class="create-post-btn" onclick="window.location.href='/blog/create'">
@@ -146,26 +236,34 @@ BLOG_LIST_TEMPLATE = """
     </button>
 
     <script>
+        // The first page is rendered on the server; continue from its cursor
+        let nextCursor = {{ next_cursor | tojson }};
+        let loading = false;
+        let exhausted = !nextCursor;
+
         async function loadBlogPosts() {
+            if (loading || exhausted) return;
+            loading = true;
             try {
-                const response = await fetch('/api/blog/posts');
-                const posts = await response.json();
+                const params = new URLSearchParams({ limit: '{{ page_size }}' });
+                if (nextCursor) params.set('cursor', nextCursor);
+                const response = await fetch(`/api/blog/posts?${params}`);
+                const page = await response.json();
                 
                 const blogGrid = document.getElementById('blogGrid');
                 const noPosts = document.getElementById('noPosts');
                 
-                if (posts.length === 0) {
+                if (page.posts.length === 0 && !nextCursor) {
                     noPosts.style.display = 'block';
-                    return;
                 }
                 
-                blogGrid.innerHTML = posts.map(post => `
+                blogGrid.insertAdjacentHTML('beforeend', page.posts.map(post => `
                     <div class="blog-card">
                         <h3>${post.title}</h3>
                         <div class="meta">
-                            By ${post.author} • ${new Date(post.created_at).toLocaleDateString()}
+                            By ${post.author} • ${new Date(post.created_at).toLocaleDateString('en-US', { month: 'long', day: '2-digit', year: 'numeric' })}
                         </div>
-                        <div class="excerpt">${post.excerpt || post.content.substring(0, 150) + '...'}</div>
+                        <div class="excerpt">${post.excerpt}</div>
                         ${post.tags.length > 0 ? `
                             <div class="tags">
                                 ${post.tags.map(tag => `<span class="tag">${tag.trim()}</span>`).join('')}
@@ -173,13 +271,30 @@ BLOG_LIST_TEMPLATE = """
                         ` : ''}
                         <a href="/blog/post/${post.id}" class="read-more">Read More →</a>
                     </div>
-                `).join('');
+                `).join(''));
+                
+                nextCursor = page.next_cursor;
+                exhausted = !nextCursor;
             } catch (error) {
                 console.error('Error loading blog posts:', error);
+                exhausted = true;
+            } finally {
+                loading = false;
+            }
+            
+            // Keep going while the end of the list is still on screen
+            const sentinel = document.getElementById('loadMore');
+            if (!exhausted && sentinel.getBoundingClientRect().top < window.innerHeight + 400) {
+                loadBlogPosts();
             }
         }
         
-        loadBlogPosts();
+        // Infinite scroll: fetch the next page as the end of the list comes into view
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadBlogPosts();
+            }
+        }, { rootMargin: '400px' }).observe(document.getElementById('loadMore'));
     </script>
 </body>
 </html>
@@ -498,29 +613,318 @@ BLOG_POST_TEMPLATE = """
 </html>
 """
 
+# Templates are compiled once per process instead of on every request
+_compiled_templates = {}
+
+# Rendered pages keyed by what they were rendered from, LRU-bounded
+PAGE_CACHE_SIZE = int(os.environ.get('BLOG_PAGE_CACHE_SIZE', 256))
+_page_cache = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+
+def get_template(name, source):
+    template = _compiled_templates.get(name)
+    if template is None:
+        template = _compiled_templates[name] = current_app.jinja_env.from_string(source)
+    return template
+
+
+def render_cached(key, name, source, context_fn):
+    """Render a page once per cache key, returning (html, etag).
+
+    ``key`` must change whenever the page content would, so a hit never
+    serves stale HTML even without explicit invalidation.
+    """
+    with _page_cache_lock:
+        cached = _page_cache.get(key)
+        if cached is not None:
+            _page_cache.move_to_end(key)
+            return cached
+    context = context_fn()
+    current_app.update_template_context(context)
+    html = get_template(name, source).render(context)
+    cached = (html, hashlib.sha1(html.encode()).hexdigest())
+    with _page_cache_lock:
+        _page_cache[key] = cached
+        while len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    return cached
+
+
+def invalidate_pages(post_id=None):
+    """Drop cached pages after a write: the listing and, if given, one post"""
+    with _page_cache_lock:
+        for key in list(_page_cache):
+            if key[0] == 'list' or (post_id is not None and key[:2] == ('post', post_id)):
+                del _page_cache[key]
+
+
+def html_response(html, etag):
+    """Serve rendered HTML with an ETag, answering 304 when it matches.
+
+    Pages the compression hook will encode get a weak ETag up front, so a
+    304 carries the same validator (and Vary) as the 200 it stands for.
+    """
+    response = make_response(html)
+    compressible = len(response.get_data()) >= COMPRESS_MIN_SIZE
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(etag, weak=compressible and negotiate(request.accept_encodings) is not None)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @blog_bp.route('/blog')
 def blog_list():
-    """Display blog listing page"""
-    return render_template_string(BLOG_LIST_TEMPLATE)
+    """Display blog listing page with the first page of posts rendered in"""
+    # Any create/edit/delete moves the latest update time or the post count
+    version = db.session.query(
+        db.func.max(BlogPost.created_at), db.func.max(BlogPost.updated_at),
+        db.func.count(BlogPost.id)).filter(BlogPost.is_published).one()
+
+    def context():
+        posts, next_cursor = query_post_page(LIST_FIELDS, LIST_PAGE_SIZE)
+        return {'posts': posts, 'next_cursor': next_cursor, 'page_size': LIST_PAGE_SIZE}
+
+    html, etag = render_cached(('list',) + tuple(version), 'blog_list', BLOG_LIST_TEMPLATE, context)
+    return html_response(html, etag)
 
 @blog_bp.route('/blog/create')
 def blog_create():
     """Display blog creation page"""
-    return render_template_string(BLOG_CREATE_TEMPLATE)
+    html, etag = render_cached(('create',), 'blog_create', BLOG_CREATE_TEMPLATE, dict)
+    return html_response(html, etag)
 
 @blog_bp.route('/blog/post/<int:post_id>')
 def blog_post(post_id):
     """Display individual blog post"""
-    post = BlogPost.query.get_or_404(post_id)
-    return render_template_string(BLOG_POST_TEMPLATE, post=post)
+    row = db.session.query(BlogPost.updated_at).filter_by(id=post_id).first()
+    if row is None:
+        abort(404)
+
+    def context():
+        return {'post': db.session.get(BlogPost, post_id)}
+
+    html, etag = render_cached(('post', post_id, row.updated_at), 'blog_post', BLOG_POST_TEMPLATE, context)
+    return html_response(html, etag)
+
+def encode_cursor(created_at, post_id):
+    raw = json.dumps([created_at.isoformat(), post_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    created_at, post_id = json.loads(raw)
+    return datetime.fromisoformat(created_at), int(post_id)
+
+
+def query_post_page(fields, limit, cursor=None, tag=None):
+    """Fetch one page of published posts; returns (posts, next_cursor).
+
+    ``tag`` restricts the page to posts carrying that (normalized) tag.
+    Raises ValueError for unknown fields or a malformed cursor.
+    """
+    if any(f not in POST_FIELDS for f in fields):
+        raise ValueError(f'fields must be a subset of {", ".join(POST_FIELDS)}')
+
+    # Always fetch the cursor columns, then drop them if not requested
+    columns = tuple(dict.fromkeys(tuple(fields) + ('created_at', 'id')))
+    query = db.session.query(*(POST_FIELDS[f].label(f) for f in columns)).filter(
+        BlogPost.is_published)
+    if tag:
+        query = filter_by_tag(query, tag)
+    if cursor:
+        try:
+            created_at, post_id = decode_cursor(cursor)
+        except Exception:
+            raise ValueError('Invalid cursor')
+        query = query.filter(db.or_(
+            BlogPost.created_at < created_at,
+            db.and_(BlogPost.created_at == created_at, BlogPost.id < post_id)))
+    rows = query.order_by(BlogPost.created_at.desc(), BlogPost.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    posts = []
+    for row in rows:
+        data = dict(zip(columns, row))
+        if 'tags' in data:
+            data['tags'] = [t.strip() for t in (data['tags'] or '').split(',') if t.strip()]
+        posts.append({k: v for k, v in data.items() if k in fields})
+    return posts, next_cursor
+
+
+def serialize_post(post):
+    """JSON shape of a projected post, matching BlogPost.to_dict()"""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in post.items()}
+
 
 @blog_bp.route('/api/blog/posts', methods=['GET'])
 @cross_origin()
 def get_blog_posts():
-    """Get all published blog posts"""
+    """Get a page of published blog posts, newest first.
+
+    ?limit= sets the page size, ?cursor= continues from a previous page's
+    next_cursor, ?fields= selects the columns returned (defaults to the
+    list view fields, which exclude the full content) and ?tag= filters by
+    tag.
+    """
+    try:
+        fields = request.args.get('fields')
+        fields = tuple(fields.split(',')) if fields else LIST_FIELDS
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        try:
+            posts, next_cursor = query_post_page(fields, limit, request.args.get('cursor'),
+                                                 request.args.get('tag'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'posts': [serialize_post(p) for p in posts], 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def normalize_tags(tags):
+    """Split a comma-separated tag string into unique lowercase tag names"""
+    names = (' '.join(t.split()).lower() for t in (tags or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def filter_by_tag(query, tag):
+    """Restrict a BlogPost query to one tag via the indexed tag tables"""
+    names = normalize_tags(tag)
+    return query.join(blog_post_tags, blog_post_tags.c.post_id == BlogPost.id).join(
+        BlogTag, BlogTag.id == blog_post_tags.c.tag_id).filter(BlogTag.name == (names[0] if names else ''))
+
+
+_search_index_ready = False
+
+
+def use_fts():
+    return db.engine.dialect.name == 'sqlite'
+
+
+@blog_bp.before_request
+def ensure_search_index():
+    """Fallback for databases set up before init-db built the search index.
+
+    Runs in its own transaction before the request touches the session,
+    so the DDL commits independently of whatever the view does.
+    """
+    global _search_index_ready
+    if not _search_index_ready:
+        create_search_index()
+        _search_index_ready = True
+
+
+def create_search_index():
+    """Create the FTS5 table if missing, backfilling posts and tag links"""
+    if not use_fts():
+        return
+    with db.engine.begin() as conn:
+        exists = conn.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'blog_post_fts'")).first()
+        if not exists:
+            conn.execute(db.text(
+                "CREATE VIRTUAL TABLE blog_post_fts USING fts5("
+                "title, excerpt, content, tags, tokenize = 'porter unicode61')"))
+            posts = conn.execute(db.select(
+                BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.content, BlogPost.tags)).all()
+            tags = {post.id: normalize_tags(post.tags) for post in posts}
+            if posts:
+                conn.execute(db.text(
+                    "INSERT INTO blog_post_fts (rowid, title, excerpt, content, tags) "
+                    "VALUES (:id, :title, :excerpt, :content, :tags)"),
+                    [{'id': p.id, 'title': p.title, 'excerpt': p.excerpt or '',
+                      'content': p.content, 'tags': ' '.join(tags[p.id])} for p in posts])
+            names = set().union(*tags.values())
+            known = dict(conn.execute(db.select(BlogTag.name, BlogTag.id)).all())
+            if names - known.keys():
+                conn.execute(BlogTag.__table__.insert(), [{'name': n} for n in names - known.keys()])
+                known = dict(conn.execute(db.select(BlogTag.name, BlogTag.id)).all())
+            conn.execute(blog_post_tags.delete())
+            links = [{'post_id': post_id, 'tag_id': known[n]} for post_id, ns in tags.items() for n in ns]
+            if links:
+                conn.execute(blog_post_tags.insert(), links)
+
+
+def index_post(post):
+    """Refresh a post's FTS row and tag links inside the current transaction"""
+    names = normalize_tags(post.tags)
+    db.session.execute(blog_post_tags.delete().where(blog_post_tags.c.post_id == post.id))
+    if names:
+        existing = {t.name: t for t in BlogTag.query.filter(BlogTag.name.in_(names))}
+        for name in names:
+            if name not in existing:
+                existing[name] = BlogTag(name=name)
+                db.session.add(existing[name])
+        db.session.flush()
+        db.session.execute(blog_post_tags.insert(),
+                           [{'post_id': post.id, 'tag_id': existing[n].id} for n in names])
+    if use_fts():
+        db.session.execute(db.text("DELETE FROM blog_post_fts WHERE rowid = :id"), {'id': post.id})
+        db.session.execute(db.text(
+            "INSERT INTO blog_post_fts (rowid, title, excerpt, content, tags) "
+            "VALUES (:id, :title, :excerpt, :content, :tags)"),
+            {'id': post.id, 'title': post.title, 'excerpt': post.excerpt or '',
+             'content': post.content, 'tags': ' '.join(names)})
+
+
+def unindex_post(post_id):
+    db.session.execute(blog_post_tags.delete().where(blog_post_tags.c.post_id == post_id))
+    if use_fts():
+        db.session.execute(db.text("DELETE FROM blog_post_fts WHERE rowid = :id"), {'id': post_id})
+
+
+def fts_query(q):
+    """Quote user terms for FTS5 MATCH; the last term matches as a prefix"""
+    terms = [t.replace('"', '') for t in q.split()]
+    terms = [t for t in terms if t]
+    if not terms:
+        return None
+    return ' '.join(f'"{t}"' for t in terms) + '*'
+
+
+@blog_bp.route('/api/blog/search', methods=['GET'])
+@cross_origin()
+def search_blog_posts():
+    """Ranked full-text search over published posts (?q=, optional ?tag=)"""
     try:
-        posts = BlogPost.query.filter_by(is_published=True).order_by(BlogPost.created_at.desc()).all()
-        return jsonify([post.to_dict() for post in posts])
+        q = request.args.get('q', '')
+        tag = request.args.get('tag')
+        limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        match = fts_query(q)
+        if match is None and not tag:
+            return jsonify({'error': 'q or tag is required'}), 400
+
+        columns = [POST_FIELDS[f].label(f) for f in LIST_FIELDS]
+        if match is None:
+            query = db.session.query(*columns).order_by(BlogPost.created_at.desc())
+        elif use_fts():
+            fts = db.table('blog_post_fts', db.column('rowid'))
+            rank = db.literal_column('bm25(blog_post_fts, 10.0, 5.0, 1.0, 3.0)')
+            snippet = db.literal_column("snippet(blog_post_fts, 2, '<mark>', '</mark>', '…', 12)")
+            query = db.session.query(*columns, snippet.label('snippet')).join(
+                fts, fts.c.rowid == BlogPost.id).filter(
+                db.literal_column('blog_post_fts').op('MATCH')(match)).order_by(rank)
+        else:
+            # Non-SQLite databases: unranked substring match
+            like = f"%{q.strip()}%"
+            query = db.session.query(*columns).filter(db.or_(
+                BlogPost.title.ilike(like), BlogPost.excerpt.ilike(like),
+                BlogPost.content.ilike(like))).order_by(BlogPost.created_at.desc())
+        query = query.filter(BlogPost.is_published)
+        if tag:
+            query = filter_by_tag(query, tag)
+
+        results = []
+        for row in query.limit(limit).all():
+            post = dict(row._mapping)
+            post['tags'] = [t.strip() for t in (post['tags'] or '').split(',') if t.strip()]
+            results.append(serialize_post(post))
+        return jsonify({'results': results})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -544,7 +948,10 @@ def create_blog_post():
         )
         
         db.session.add(post)
+        db.session.flush()
+        index_post(post)
         db.session.commit()
+        invalidate_pages()
         
         return jsonify(post.to_dict()), 201
         
@@ -584,7 +991,9 @@ def update_blog_post(post_id):
             post.is_published = data['is_published']
         
         post.updated_at = datetime.utcnow()
+        index_post(post)
         db.session.commit()
+        invalidate_pages(post_id)
         
         return jsonify(post.to_dict())
         
@@ -598,8 +1007,10 @@ def delete_blog_post(post_id):
     """Delete a blog post"""
     try:
         post = BlogPost.query.get_or_404(post_id)
+        unindex_post(post_id)
         db.session.delete(post)
         db.session.commit()
+        invalidate_pages(post_id)
         
         return jsonify({'message': 'Post deleted successfully'})
         
@@ -0,0 +1,59 @@
+from models.user import db
+
+
+class CachedVideoInfo(db.Model):
+    """Persistent tier of the /info metadata cache, keyed by canonical URL"""
+    key = db.Column(db.String(2048), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<CachedVideoInfo {self.key}>'
+
+
+class StoredDownload(db.Model):
+    """Index of finished downloads keyed by (extractor, video id, format)"""
+    __table_args__ = (db.UniqueConstraint('extractor', 'video_id', 'format_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    extractor = db.Column(db.String(64), nullable=False)
+    video_id = db.Column(db.String(255), nullable=False)
+    format_id = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    filesize = db.Column(db.Integer)
+    created_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<StoredDownload {self.extractor}:{self.video_id} {self.format_id}>'
+
+    def to_dict(self):
+        return {
+            'extractor': self.extractor,
+            'video_id': self.video_id,
+            'format_id': self.format_id,
+            'filename': self.filename,
+            'filesize': self.filesize
+        }
+
+
+class ProcessedFile(db.Model):
+    """Cached post-processing results keyed by (source file, processing profile)"""
+    __table_args__ = (db.UniqueConstraint('source', 'profile'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(255), nullable=False)
+    profile = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    filesize = db.Column(db.Integer)
+    created_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<ProcessedFile {self.source} {self.profile}>'
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'profile': self.profile,
+            'filename': self.filename,
+            'filesize': self.filesize
+        }
@@ -1,13 +1,61 @@
-from flask import Blueprint, jsonify, request
+import json
+import os
+from collections import Counter
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
 from models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+# Rows written per transaction by the bulk endpoints
+BULK_BATCH_SIZE = int(os.environ.get('USER_BULK_BATCH_SIZE', 1000))
+USER_FIELDS = ('username', 'email')
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+
+
+def prefix_range(column, prefix):
+    """``column LIKE 'prefix%'`` as a range, so the unique index is used"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) if ord(prefix[-1]) < 0x10FFFF else None
+    return column >= prefix if upper is None else db.and_(column >= prefix, column < upper)
+
 
+def filtered_users():
+    query = select(User.id, User.username, User.email)
+    for field in USER_FIELDS:
+        prefix = request.args.get(f'{field}_prefix')
+        if prefix:
+            query = query.where(prefix_range(getattr(User, field), prefix))
+    return query.order_by(User.id)
+
+
+# List users a page at a time (keyset on id), or export them all as NDJSON
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    query = filtered_users()
+
+    if request.args.get('format') == 'ndjson':
+        # yield_per streams from a server-side cursor where the driver has one
+        def generate():
+            rows = db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            for chunk in rows.partitions():
+                yield ''.join(json.dumps(row._asdict()) + '\n' for row in chunk)
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor', type=int)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    users = [row._asdict() for row in rows[:limit]]
+    next_cursor = users[-1]['id'] if len(rows) > limit else None
+    return jsonify({'users': users, 'next_cursor': next_cursor})
 
 
 @user_bp.route('/users', methods=['POST'])
@@ -42,3 +90,225 @@ def delete_user(user_id):
     db.session.delete(user)
     db.session.commit()
     return '', 204
+
+
+# Stands in for an NDJSON line that is not valid JSON
+MALFORMED = object()
+
+
+# Rows of a bulk request: a JSON array, or NDJSON read line by line
+def read_bulk_rows():
+    if request.mimetype in NDJSON_TYPES:
+        def lines():
+            for line in request.stream:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield MALFORMED
+        return lines()
+    rows = request.get_json(silent=True)
+    return rows if isinstance(rows, list) else None
+
+
+def batched(rows, size):
+    batch = []
+    for index, row in enumerate(rows):
+        batch.append((index, row))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_response(rows, handle_batch):
+    """Run ``handle_batch`` over ``rows`` in batches, streaming one NDJSON
+    result per row and a final summary line"""
+    if rows is None:
+        return jsonify({'error': 'Expected a JSON array or an NDJSON body'}), 400
+
+    def generate():
+        counts = Counter()
+        for batch in batched(rows, BULK_BATCH_SIZE):
+            results = [invalid(index, 'invalid JSON') for index, row in batch if row is MALFORMED]
+            parsed = [(index, row) for index, row in batch if row is not MALFORMED]
+            if parsed:
+                results.extend(handle_batch(parsed))
+            for result in sorted(results, key=lambda result: result['index']):
+                counts[result['status']] += 1
+                yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': dict(counts)}) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def user_values(row, required):
+    if not isinstance(row, dict):
+        return None
+    values = {f: row[f] for f in USER_FIELDS if f in row}
+    if not all(isinstance(v, str) and v for v in values.values()):
+        return None
+    if required and len(values) < len(USER_FIELDS):
+        return None
+    return values
+
+
+def row_id(row):
+    value = row.get('id') if isinstance(row, dict) else row
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def taken_values(rows):
+    """Map each (field, value) of ``rows`` already in the table to its owner's id"""
+    taken = {}
+    for field in USER_FIELDS:
+        values = {values[field] for _, values in rows if field in values}
+        if values:
+            column = getattr(User, field)
+            for user_id, value in db.session.execute(select(User.id, column).where(column.in_(values))):
+                taken[(field, value)] = user_id
+    return taken
+
+
+def find_conflicts(rows, ids=None):
+    """Split ``rows`` into those that can be written and per-row conflicts.
+
+    A row conflicts when one of its unique values belongs to another user
+    or was already claimed by an earlier row of the same batch.
+    """
+    taken = taken_values(rows)
+    claimed = {}
+    ok, conflicts = [], {}
+    for index, values in rows:
+        owner = ids[index] if ids else ('row', index)
+        field = next((f for f in USER_FIELDS if f in values and (
+            taken.get((f, values[f]), owner) != owner
+            or claimed.get((f, values[f]), owner) != owner)), None)
+        if field:
+            conflicts[index] = {'index': index, 'status': 'conflict', 'field': field,
+                                'error': f'{field} {values[field]!r} is already taken'}
+            continue
+        claimed.update(((f, values[f]), owner) for f in values)
+        ok.append((index, values))
+    return ok, conflicts
+
+
+def invalid(index, error):
+    return {'index': index, 'status': 'invalid', 'error': error}
+
+
+def conflict_after_race(index, values, user_id=None):
+    db.session.rollback()
+    for field in USER_FIELDS:
+        column = getattr(User, field)
+        if field in values and db.session.scalar(
+                select(User.id).where(column == values[field], User.id != user_id)) is not None:
+            return {'index': index, 'status': 'conflict', 'field': field,
+                    'error': f'{field} {values[field]!r} is already taken'}
+    return {'index': index, 'status': 'conflict', 'error': 'Unique constraint failed'}
+
+
+def create_batch(batch):
+    results, rows = {}, []
+    for index, row in batch:
+        values = user_values(row, required=True)
+        if values is None:
+            results[index] = invalid(index, 'username and email are required strings')
+        else:
+            rows.append((index, values))
+    rows, conflicts = find_conflicts(rows)
+    results.update(conflicts)
+
+    if rows:
+        try:
+            ids = db.session.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [values for _, values in rows]).all()
+            db.session.commit()
+            for (index, _), user_id in zip(rows, ids):
+                results[index] = {'index': index, 'status': 'created', 'id': user_id}
+        except IntegrityError:
+            # Another writer took a value after the check: retry row by row
+            db.session.rollback()
+            for index, values in rows:
+                try:
+                    user = User(**values)
+                    db.session.add(user)
+                    db.session.commit()
+                    results[index] = {'index': index, 'status': 'created', 'id': user.id}
+                except IntegrityError:
+                    results[index] = conflict_after_race(index, values)
+    return [results[index] for index, _ in batch]
+
+
+def update_batch(batch):
+    results, rows, ids = {}, [], {}
+    for index, row in batch:
+        user_id, values = row_id(row), user_values(row, required=False)
+        if user_id is None or not values:
+            results[index] = invalid(index, 'id and username or email are required')
+        else:
+            rows.append((index, values))
+            ids[index] = user_id
+    existing = set(db.session.scalars(select(User.id).where(User.id.in_(set(ids.values())))))
+    for index, values in list(rows):
+        if ids[index] not in existing:
+            results[index] = {'index': index, 'id': ids[index], 'status': 'not_found'}
+    rows = [(index, values) for index, values in rows if ids[index] in existing]
+    rows, conflicts = find_conflicts(rows, ids)
+    results.update(conflicts)
+
+    if rows:
+        try:
+            db.session.execute(update(User), [dict(values, id=ids[index]) for index, values in rows])
+            db.session.commit()
+            for index, _ in rows:
+                results[index] = {'index': index, 'id': ids[index], 'status': 'updated'}
+        except IntegrityError:
+            db.session.rollback()
+            for index, values in rows:
+                try:
+                    db.session.execute(update(User).where(User.id == ids[index]).values(**values))
+                    db.session.commit()
+                    results[index] = {'index': index, 'id': ids[index], 'status': 'updated'}
+                except IntegrityError:
+                    results[index] = conflict_after_race(index, values, ids[index])
+    return [results[index] for index, _ in batch]
+
+
+def delete_batch(batch):
+    ids = {index: row_id(row) for index, row in batch}
+    wanted = {user_id for user_id in ids.values() if user_id is not None}
+    existing = set(db.session.scalars(select(User.id).where(User.id.in_(wanted))))
+    if existing:
+        db.session.execute(delete(User).where(User.id.in_(existing)))
+        db.session.commit()
+
+    results, deleted = [], set()
+    for index, user_id in ids.items():
+        if user_id is None:
+            results.append(invalid(index, 'id must be an integer'))
+        elif user_id in existing and user_id not in deleted:
+            deleted.add(user_id)
+            results.append({'index': index, 'id': user_id, 'status': 'deleted'})
+        else:
+            results.append({'index': index, 'id': user_id, 'status': 'not_found'})
+    return results
+
+
+# Bulk create: one transaction per batch, conflicts reported per row
+@user_bp.route('/users/bulk', methods=['POST'])
+def create_users_bulk():
+    return bulk_response(read_bulk_rows(), create_batch)
+
+
+# Bulk update: rows are {"id": ..., "username"?: ..., "email"?: ...}
+@user_bp.route('/users/bulk', methods=['PUT'])
+def update_users_bulk():
+    return bulk_response(read_bulk_rows(), update_batch)
+
+
+# Bulk delete: rows are user ids or {"id": ...}
+@user_bp.route('/users/bulk', methods=['DELETE'])
+def delete_users_bulk():
+    return bulk_response(read_bulk_rows(), delete_batch)
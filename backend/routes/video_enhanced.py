@@ -1,17 +1,235 @@
-from flask import Blueprint, request, jsonify, send_file
-import yt_dlp
+from flask import Blueprint, Response, current_app, redirect, request, jsonify
+import hashlib
+import json
+import math
+import mimetypes
 import os
-import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+from models.user import db
+from models.video import ProcessedFile, StoredDownload
+from services.batch import stream_ndjson
+from services.compression import no_compress
+from services.formats import build_ladder, find_rung
+from services.info_cache import DatabaseTier, InfoCache, canonicalize_url
+from services.jobs import DownloadJob, JobQueue, QueueFull
+from services.metrics import registry, ytdlp_phase
+from services.passthrough import http_chunks, is_progressive, subprocess_chunks, tee
+from services.postprocess import ProcessSpec, Transcoder
+from services.ratelimit import (RATE_LIMITED, LoadShedder, RateLimiter, backend_from_url,
+                                client_key, parse_limit, too_costly)
+from services.storage import StorageManager
+from services.ydl_pool import YDLPool, load_yt_dlp, yt_dlp_import_seconds
+from services.streaming import offload_response, send_file_range
+from services.thumbnails import ThumbnailCache, ThumbnailError, thumbnail_key
 
 # ⚡ Do NOT put url_prefix here, only in main.py
 video_enhanced_bp = Blueprint("video_enhanced", __name__)
 
-DOWNLOAD_DIR = "downloads"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+DOWNLOAD_DIR = os.environ.get("DOWNLOAD_DIR", "downloads")
+
+
+# Drop index rows for files the sweeper evicted
+def _forget_stored(filename):
+    StoredDownload.query.filter_by(filename=filename).delete()
+    ProcessedFile.query.filter_by(filename=filename).delete()
+    db.session.commit()
+
+
+# Sharded download store with quota/age eviction, sized via the environment
+storage = StorageManager(
+    DOWNLOAD_DIR,
+    quota_bytes=int(os.environ.get("STORAGE_QUOTA_BYTES", 10 * 1024 ** 3)),
+    max_age=int(os.environ.get("STORAGE_MAX_AGE", 7 * 24 * 3600)),
+    sweep_interval=int(os.environ.get("STORAGE_SWEEP_INTERVAL", 300)),
+    part_grace=int(os.environ.get("STORAGE_PART_GRACE", 3600)),
+    on_evict=_forget_stored,
+)
+
+
+# Proxied thumbnails in their own size-bounded store, so the frontend never
+# hot-links the origin CDN
+thumbnail_storage = StorageManager(
+    os.environ.get("THUMBNAIL_DIR", "thumbnails"),
+    quota_bytes=int(os.environ.get("THUMBNAIL_CACHE_BYTES", 512 * 1024 ** 2)),
+    max_age=int(os.environ.get("THUMBNAIL_MAX_AGE", 7 * 24 * 3600)),
+    sweep_interval=int(os.environ.get("STORAGE_SWEEP_INTERVAL", 300)),
+)
+thumbnails = ThumbnailCache(
+    thumbnail_storage,
+    widths=[int(w) for w in os.environ.get("THUMBNAIL_WIDTHS", "160,320,640").split(",")],
+)
+THUMBNAIL_HTTP_MAX_AGE = int(os.environ.get("THUMBNAIL_HTTP_MAX_AGE", 30 * 24 * 3600))
+
+
+# Hand file transfers to a front proxy: "x-accel-redirect" (nginx) or "x-sendfile"
+STREAM_OFFLOAD = os.environ.get("STREAM_OFFLOAD", "")
+STREAM_OFFLOAD_PREFIX = os.environ.get("STREAM_OFFLOAD_PREFIX", "/protected-downloads/")
+
+
+# Started on first request rather than at import, so each forked worker runs one
+@video_enhanced_bp.before_app_request
+def _start_storage_sweeper():
+    storage.start(current_app._get_current_object())
+    thumbnail_storage.start(current_app._get_current_object())
+
+# Background download workers, sized per box via the environment
+download_queue = JobQueue(
+    max_workers=int(os.environ.get("DOWNLOAD_WORKERS", 4)),
+    max_queued=int(os.environ.get("DOWNLOAD_QUEUE_DEPTH", 32)),
+    event_interval=float(os.environ.get("PROGRESS_EVENT_INTERVAL", 0.5)),
+)
+SSE_HEARTBEAT = 15
+
+# Trimmed /info payloads, optionally persisted in the app database
+info_store = None
+if os.environ.get("INFO_CACHE_PERSIST") == "1":
+    info_store = DatabaseTier(max_rows=int(os.environ.get("INFO_CACHE_DB_MAX_ROWS", 10000)))
+info_cache = InfoCache(
+    maxsize=int(os.environ.get("INFO_CACHE_SIZE", 1024)),
+    ttl=int(os.environ.get("INFO_CACHE_TTL", 600)),
+    store=info_store,
+)
+
+
+# Reusable YoutubeDL instances, one idle stack per option profile
+ydl_pool = YDLPool(
+    max_idle=int(os.environ.get("YDL_POOL_SIZE", 4)),
+    max_uses=int(os.environ.get("YDL_POOL_MAX_USES", 200)),
+    max_age=int(os.environ.get("YDL_POOL_MAX_AGE", 900)),
+)
+INFO_PROFILE = {"quiet": True, "skip_download": True}
+DOWNLOAD_PROFILE = {"quiet": True, "noprogress": True}
+
+# ffmpeg remux/transcode/trim processes, capped apart from the download workers
+transcoder = Transcoder(
+    max_workers=int(os.environ.get("TRANSCODE_WORKERS", max(1, (os.cpu_count() or 2) // 2))),
+    ffmpeg=os.environ.get("FFMPEG_BINARY"),
+    timeout=int(os.environ.get("TRANSCODE_TIMEOUT", 3600)),
+)
+
+# Shared workers for batch/playlist endpoints; BATCH_CONCURRENCY caps one request
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BATCH_WORKERS", 8)),
+    thread_name_prefix="batch",
+)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 500))
+
+# Per-client token buckets ("count/seconds"; empty disables). RATE_LIMIT_BACKEND
+# is "memory" (per worker), "sqlite:///path" (per host) or "redis://..." (shared)
+rate_limiter = RateLimiter(
+    backend_from_url(os.environ.get("RATE_LIMIT_BACKEND", "memory")),
+    limits={name: parse_limit(value) for name, value in {
+        "extract": os.environ.get("RATE_LIMIT_EXTRACT", "30/60"),
+        "download": os.environ.get("RATE_LIMIT_DOWNLOAD", "10/60"),
+    }.items() if value},
+)
+
+# Every request holds a server thread (gunicorn.conf.py) for as long as it
+# runs, so long responses are capped below GUNICORN_THREADS and refused with
+# a 503 beyond that, leaving threads for the short requests
+SERVER_THREADS = int(os.environ.get("GUNICORN_THREADS", 32))
+
+# Refuse new yt-dlp work with a 503 instead of queueing when saturated
+load_shedder = LoadShedder(
+    max_inflight=int(os.environ.get("SHED_MAX_INFLIGHT", max(SERVER_THREADS // 2, 1))),
+    max_load=float(os.environ.get("SHED_MAX_LOAD", 0)),
+)
+
+# Progress streams; a refused client polls the job status instead
+sse_streams = LoadShedder(
+    max_inflight=int(os.environ.get("SSE_MAX_STREAMS", max(SERVER_THREADS // 4, 1))),
+    retry_after=5,
+)
+
+
+# Queue and pool state, read when /metrics is scraped
+download_queue_pending = registry.gauge("download_queue_pending", "Download jobs waiting for a worker")
+shed_requests = registry.gauge("load_shed_requests", "Requests refused by the load shedder")
+ydl_pool_idle = registry.gauge("ydl_pool_idle", "Idle pooled YoutubeDL instances")
+ytdlp_import = registry.gauge("ytdlp_import_seconds", "Time the lazy yt-dlp import took")
+transcode_active = registry.gauge("transcode_jobs_active", "ffmpeg runs queued or running")
+
+
+@registry.collector
+def _collect_metrics():
+    download_queue_pending.set(download_queue.pending)
+    shed_requests.set(load_shedder.shed)
+    ydl_pool_idle.set(ydl_pool.stats()["idle"])
+    transcode_active.set(transcoder.active)
+    if yt_dlp_import_seconds() is not None:
+        ytdlp_import.set(yt_dlp_import_seconds())
+
+
+# Extract and trim video metadata (cache loader for /info)
+def _extract_info(url):
+    start = time.perf_counter()
+    with ydl_pool.checkout(INFO_PROFILE) as ydl:
+        info = ydl.extract_info(url, download=False)
+    ytdlp_phase.observe(time.perf_counter() - start, "info")
+    return _trim_info(info)
+
+
+# Reduce a yt-dlp info dict to the /info payload
+def _trim_info(info):
+    formats = [{
+        "format_id": f["format_id"],
+        "ext": f.get("ext"),
+        "quality": f.get("height", "Unknown")
+    } for f in info.get("formats", []) if f.get("height")]
+    return {
+        "id": info.get("id"),
+        "extractor": info.get("extractor_key"),
+        "title": info.get("title"),
+        "uploader": info.get("uploader"),
+        "duration": info.get("duration"),
+        "view_count": info.get("view_count"),
+        "thumbnail": info.get("thumbnail"),
+        "formats": formats,
+        "ladder": build_ladder(info.get("formats") or [], info.get("duration"))
+    }
+
+
+# Point an /info payload's thumbnail at the proxy; the cached payload is left as is
+def _with_thumbnail(info):
+    source = info.get("thumbnail")
+    if not source or not info.get("id"):
+        return info
+    key = thumbnail_key(info.get("extractor"), info["id"])
+    thumbnails.register(key, source)
+    url = f"/api/video/thumbnail/{key}"
+    # Without Pillow every width serves the original image, so no sizes are listed
+    widths = thumbnails.widths if thumbnails.stats()["resize"] else ()
+    return dict(info, thumbnail=url, thumbnails=[
+        {"width": width, "url": f"{url}?w={width}"} for width in widths])
+
+
+# Batch requests spend one rate limit token per URL
+def _batch_cost():
+    urls = (request.get_json(silent=True) or {}).get("urls")
+    return max(len(urls), 1) if isinstance(urls, list) else 1
+
+
+# Playlist entries found by a batch spend a token each from ``name``; the
+# returned ``charge(count)`` gives an error row, or None if admitted
+def _entry_charge(name):
+    client = client_key(request.headers, request.remote_addr)
+
+    def charge(count):
+        wait = rate_limiter.retry_after(name, client, count)
+        if wait is None:
+            return None
+        if wait == math.inf:
+            return {"error": too_costly(count, rate_limiter.limits[name][1])}
+        return {"error": RATE_LIMITED, "retry_after": math.ceil(wait)}
+    return charge
 
 
 # Get video info
 @video_enhanced_bp.route("/info", methods=["POST"])
+@rate_limiter.limit("extract")
+@load_shedder.guard()
 def get_video_info():
     data = request.get_json()
     url = data.get("url")
@@ -20,28 +238,270 @@ def get_video_info():
         return jsonify({"error": "URL is required"}), 400
 
     try:
-        ydl_opts = {"quiet": True, "skip_download": True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            formats = [{
-                "format_id": f["format_id"],
-                "ext": f.get("ext"),
-                "quality": f.get("height", "Unknown")
-            } for f in info.get("formats", []) if f.get("height")]
-            return jsonify({
-                "title": info.get("title"),
-                "uploader": info.get("uploader"),
-                "duration": info.get("duration"),
-                "view_count": info.get("view_count"),
-                "thumbnail": info.get("thumbnail"),
-                "formats": formats
-            })
+        return jsonify(_with_thumbnail(info_cache.get(url, _extract_info)))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# Download video
+# Enumerate a URL cheaply: playlists give entry URLs, videos their full info
+def _expand_url(url):
+    profile = {"quiet": True, "extract_flat": "in_playlist", "playlistend": BATCH_MAX_ITEMS}
+    with ydl_pool.checkout(profile) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if info.get("_type") != "playlist":
+        return info, None
+    entries = [e.get("url") or e.get("webpage_url") for e in info.get("entries") or []]
+    return info, [entry for entry in entries if entry]
+
+
+# Batch task: expand playlists, then hand each video URL to ``handle_video``
+def _batch_task(app, url, handle_video, charge=None):
+    def task():
+        with app.app_context():
+            try:
+                if charge is not None and info_cache.peek(url) is None:
+                    info, entries = _expand_url(url)
+                    if entries is not None:
+                        refused = charge(len(entries))
+                        if refused is not None:
+                            return [dict(url=url, **refused)], []
+                        playlist = {"title": info.get("title"), "count": len(entries)}
+                        return [{"url": url, "playlist": playlist}], [
+                            _batch_task(app, entry, handle_video)
+                            for entry in entries]
+                    info_cache.put(url, _trim_info(info))
+                return [dict(url=url, **handle_video(url))], []
+            except QueueFull as e:
+                return [{"url": url, "error": str(e), "retry_after": 30}], []
+            except Exception as e:
+                return [{"url": url, "error": str(e)}], []
+    return task
+
+
+# Read and validate the ``urls`` list of a batch request
+def _batch_urls(data):
+    urls = (data or {}).get("urls")
+    if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls):
+        return None, (jsonify({"error": "urls must be a non-empty list of URLs"}), 400)
+    if len(urls) > BATCH_MAX_ITEMS:
+        return None, (jsonify({"error": f"At most {BATCH_MAX_ITEMS} URLs per batch"}), 400)
+    return urls, None
+
+
+# Batch/playlist info, streamed back as NDJSON as each item completes
+@video_enhanced_bp.route("/info/batch", methods=["POST"])
+@rate_limiter.limit("extract", cost=_batch_cost)
+@load_shedder.guard()
+def get_video_info_batch():
+    urls, error = _batch_urls(request.get_json())
+    if error:
+        return error
+
+    app = current_app._get_current_object()
+
+    def handle(url):
+        return {"info": _with_thumbnail(info_cache.get(url, _extract_info))}
+
+    charge = _entry_charge("extract")
+    tasks = [_batch_task(app, url, handle, charge) for url in urls]
+    return Response(stream_ndjson(batch_executor, tasks, BATCH_CONCURRENCY),
+                    mimetype="application/x-ndjson")
+
+
+# Metadata cache counters
+@video_enhanced_bp.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(info_cache.stats())
+
+
+# Resolve the (extractor, video id) a URL points at without network access
+def _video_key(url):
+    cached = info_cache.peek(url)
+    if cached and cached.get("id"):
+        return cached["extractor"], cached["id"]
+    for ie in load_yt_dlp().extractor.gen_extractor_classes():
+        if ie.ie_key() != "Generic" and ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                return ie.ie_key(), video_id
+            break
+    return "url", hashlib.sha1(canonicalize_url(url).encode()).hexdigest()
+
+
+# Content-addressed name (without extension) for a (extractor, video id, format)
+# key; the extension is that of the container yt-dlp actually wrote
+def _stored_stem(extractor, video_id, format_id):
+    return hashlib.sha1(f"{extractor}:{video_id}:{format_id}".encode()).hexdigest()
+
+
+# Look up an already downloaded file for a key, dropping stale index rows
+def _find_stored(extractor, video_id, format_id):
+    stored = StoredDownload.query.filter_by(
+        extractor=extractor, video_id=video_id, format_id=format_id).first()
+    if stored is None:
+        return None
+    if not storage.exists(stored.filename):
+        db.session.delete(stored)
+        db.session.commit()
+        return None
+    return stored
+
+
+# Index a finished file under its (extractor, video id, format) key
+def _record_stored(app, key, filename):
+    extractor, video_id, format_id = key
+    with app.app_context():
+        try:
+            db.session.add(StoredDownload(
+                extractor=extractor, video_id=video_id, format_id=format_id,
+                filename=filename, filesize=os.path.getsize(storage.path_for(filename)),
+                created_at=time.time()))
+            db.session.commit()
+        except Exception:
+            # Another worker indexed the same key first; the file is identical
+            db.session.rollback()
+
+
+# Look up a cached post-processing result, dropping stale index rows
+def _find_processed(source, profile):
+    processed = ProcessedFile.query.filter_by(source=source, profile=profile).first()
+    if processed is None:
+        return None
+    if not storage.exists(processed.filename):
+        db.session.delete(processed)
+        db.session.commit()
+        return None
+    return processed
+
+
+# Index a finished post-processing result under its (source, profile) key
+def _record_processed(app, source, profile, filename, filesize):
+    with app.app_context():
+        try:
+            db.session.add(ProcessedFile(source=source, profile=profile, filename=filename,
+                                         filesize=filesize, created_at=time.time()))
+            db.session.commit()
+        except Exception:
+            # Another worker produced the same result first
+            db.session.rollback()
+
+
+# Job key for processing a stored file, shared by /download and /process so
+# concurrent requests for the same result attach to one job
+def _processing_key(source, spec):
+    return "file", source, spec.key
+
+
+# Hand a stored file to the transcode pool; the job finishes when ffmpeg does
+def _start_processing(job, app, source, spec):
+    filename = spec.output_name(source)
+    job.update_postprocessor({"postprocessor": spec.key, "status": "started"})
+
+    def record(filesize):
+        _record_processed(app, source, spec.key, filename, filesize)
+        job.filename = filename
+
+    return transcoder.submit(spec, storage.path_for(source),
+                             storage.path_for(filename, create=True), then=record,
+                             should_stop=lambda: job.cancel_requested)
+
+
+# Run a queued download job on a worker thread; with a ``spec`` the
+# processing stage is returned as a Future so this worker is freed
+def _run_download(job, app, key, spec=None):
+    # Written under a per-job name and renamed when complete, so concurrent
+    # jobs for the same key never share partial files
+    stem = _stored_stem(*key)
+    outtmpl = storage.path_for(f"{stem}.{job.id}.%(ext)s", create=True)
+
+    # Phase boundaries: first progress hook ends extraction, first
+    # postprocessor hook ends the transfer
+    marks = {"start": time.perf_counter()}
+    DownloadCancelled = load_yt_dlp().utils.DownloadCancelled
+
+    def progress_hook(d):
+        if job.cancel_requested:
+            raise DownloadCancelled("Download cancelled")
+        marks.setdefault("download", time.perf_counter())
+        job.update_progress(d)
+
+    def postprocessor_hook(d):
+        marks.setdefault("postprocess", time.perf_counter())
+        job.update_postprocessor(d)
+
+    try:
+        with ydl_pool.checkout(DOWNLOAD_PROFILE, format=job.format_id, outtmpl=outtmpl,
+                               progress_hooks=[progress_hook],
+                               postprocessor_hooks=[postprocessor_hook]) as ydl:
+            info = ydl.extract_info(job.url)
+            downloads = info.get("requested_downloads") or [{}]
+            filepath = downloads[-1].get("filepath") or ydl.prepare_filename(info)
+    except DownloadCancelled:
+        storage.remove_stem(f"{stem}.{job.id}")
+        return None
+    finally:
+        _observe_phases(marks)
+    filename = stem + os.path.splitext(filepath)[1]
+    os.replace(filepath, storage.path_for(filename))
+    _record_stored(app, key, filename)
+    if spec is None:
+        job.filename = filename
+        return None
+    return _start_processing(job, app, filename, spec)
+
+
+def _observe_phases(marks):
+    end = time.perf_counter()
+    bounds = [(phase, marks[phase]) for phase in ("start", "download", "postprocess") if phase in marks]
+    for (phase, begin), (_, until) in zip(bounds, bounds[1:] + [(None, end)]):
+        ytdlp_phase.observe(until - begin, "extract" if phase == "start" else phase)
+
+
+def _stored_payload(filename):
+    return {
+        "status": "done",
+        "filename": filename,
+        "download_url": f"/api/video/stream/{filename}"
+    }
+
+
+# Serve a stored (or already processed) file or queue a job; returns (payload, status)
+def _start_download(url, format_id, app, spec=None):
+    key = (*_video_key(url), format_id)
+    stored = _find_stored(*key)
+    if stored is not None and spec is None:
+        return _stored_payload(stored.filename), 200
+    if stored is not None:
+        processed = _find_processed(stored.filename, spec.key)
+        if processed is not None:
+            return _stored_payload(processed.filename), 200
+        source = stored.filename
+        run = lambda job: _start_processing(job, app, source, spec)
+        job_key = _processing_key(source, spec)
+    else:
+        run = lambda job: _run_download(job, app, key, spec)
+        job_key = key if spec is None else (*key, spec.key)
+
+    job = DownloadJob(url, format_id, key=job_key)
+    job.profile = spec.key if spec is not None else None
+    return _job_payload(*download_queue.submit(job, run)), 202
+
+
+# Response for a queued job; ``requester`` is this caller's handle for
+# DELETE /jobs/<id>?requester=, since deduplicated jobs are shared
+def _job_payload(job, requester):
+    return {
+        "job_id": job.id,
+        "requester": requester,
+        "status": job.status,
+        "status_url": f"/api/video/jobs/{job.id}"
+    }
+
+
+# Download video (queued, returns a job id immediately)
 @video_enhanced_bp.route("/download", methods=["POST"])
+@rate_limiter.limit("download")
+@load_shedder.guard(queue=download_queue)
 def download_video():
     data = request.get_json()
     url = data.get("url")
@@ -50,26 +510,224 @@ def download_video():
     if not url:
         return jsonify({"error": "URL is required"}), 400
 
+    # A ladder key from /info maps straight to its precomputed format spec
+    if data.get("quality"):
+        try:
+            rung = find_rung(info_cache.get(url, _extract_info).get("ladder"), data["quality"])
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        if rung is None:
+            return jsonify({"error": f"Unknown quality: {data['quality']}"}), 400
+        format_id = rung["format"]
+
+    # Optional pipeline stage: {"profile": "audio-mp3", "start": 10, "end": 25}
+    spec = None
+    if data.get("postprocess") is not None:
+        try:
+            spec = ProcessSpec.from_request(data["postprocess"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    try:
+        payload, status = _start_download(url, format_id, current_app._get_current_object(), spec)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(payload), status
+
+
+# Batch/playlist download: queue every video, streaming job ids as NDJSON
+@video_enhanced_bp.route("/download/batch", methods=["POST"])
+@rate_limiter.limit("download", cost=_batch_cost)
+@load_shedder.guard(queue=download_queue)
+def download_video_batch():
+    data = request.get_json()
+    urls, error = _batch_urls(data)
+    if error:
+        return error
+    format_id = data.get("format_id", "best")
+    spec = None
+    if data.get("postprocess") is not None:
+        try:
+            spec = ProcessSpec.from_request(data["postprocess"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    app = current_app._get_current_object()
+
+    def handle(url):
+        return _start_download(url, format_id, app, spec)[0]
+
+    charge = _entry_charge("download")
+    tasks = [_batch_task(app, url, handle, charge) for url in urls]
+    return Response(stream_ndjson(batch_executor, tasks, BATCH_CONCURRENCY),
+                    mimetype="application/x-ndjson")
+
+
+# Post-process an already stored file (remux, audio extraction, trimming)
+@video_enhanced_bp.route("/process", methods=["POST"])
+@rate_limiter.limit("download")
+@load_shedder.guard(queue=download_queue)
+def process_file():
+    data = request.get_json() or {}
+    source = data.get("filename")
+    try:
+        spec = ProcessSpec.from_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if not source or not storage.exists(source):
+            return jsonify({"error": "File not found"}), 404
+    except ValueError:
+        return jsonify({"error": "File not found"}), 404
+
+    processed = _find_processed(source, spec.key)
+    if processed is not None:
+        return jsonify(_stored_payload(processed.filename))
+
+    app = current_app._get_current_object()
+    job = DownloadJob(None, None, key=_processing_key(source, spec))
+    job.profile = spec.key
     try:
-        filename = f"{uuid.uuid4()}.mp4"
-        filepath = os.path.join(DOWNLOAD_DIR, filename)
+        job, requester = download_queue.submit(
+            job, lambda job: _start_processing(job, app, source, spec))
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    return jsonify(_job_payload(job, requester)), 202
 
-        ydl_opts = {"format": format_id, "outtmpl": filepath, "quiet": True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
 
-        return jsonify({
-            "filename": filename,
-            "download_url": f"/api/video/stream/{filename}"
-        })
+# Stream-through download: pipe bytes to the client as they are fetched
+@video_enhanced_bp.route("/download/stream", methods=["GET"])
+@rate_limiter.limit("download")
+@load_shedder.guard()
+@no_compress
+def download_stream():
+    url = request.args.get("url")
+    format_id = request.args.get("format_id", "best")
+    cache = request.args.get("cache", "1") != "0"
+
+    if not url:
+        return jsonify({"error": "URL is required"}), 400
+
+    lease = ydl_pool.acquire(DOWNLOAD_PROFILE, format=format_id)
+    ydl = lease.ydl
+    try:
+        info = ydl.extract_info(url, download=False)
+        key = (info["extractor_key"], info["id"], format_id)
+        stored = _find_stored(*key)
     except Exception as e:
+        ydl_pool.release(lease, healthy=False)
         return jsonify({"error": str(e)}), 500
+    if stored is not None:
+        ydl_pool.release(lease)
+        return redirect(f"/api/video/stream/{stored.filename}")
+
+    if is_progressive(info):
+        chunks = http_chunks(ydl, info)
+    else:
+        chunks = subprocess_chunks(url, format_id)
+
+    # Keep a copy for later requests unless a queued job already makes one
+    if cache and download_queue.find_active(key) is None:
+        filename = f"{_stored_stem(*key)}.{info.get('ext') or 'mp4'}"
+        app = current_app._get_current_object()
+        chunks = tee(chunks, storage.path_for(filename, create=True),
+                     lambda: _record_stored(app, key, filename))
+
+    headers = {"Cache-Control": "no-store"}
+    if is_progressive(info) and info.get("filesize"):
+        headers["Content-Length"] = str(info["filesize"])
+    response = Response(chunks, headers=headers,
+                        mimetype=mimetypes.guess_type(f"video.{info.get('ext')}")[0]
+                        or "application/octet-stream")
+    response.call_on_close(lambda: ydl_pool.release(lease))
+    return response
+
+
+# Download job status
+@video_enhanced_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_download_job(job_id):
+    job = download_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+# Download job progress as Server-Sent Events
+@video_enhanced_bp.route("/jobs/<job_id>/events", methods=["GET"])
+@no_compress
+@sse_streams.guard()
+def stream_download_job(job_id):
+    job = download_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        version = None
+        while True:
+            latest = job.wait_for_change(version, SSE_HEARTBEAT)
+            if latest == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = latest
+            yield f"id: {version}\nevent: progress\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+# Leave a queued or running download job with the ``requester`` handle its
+# submit returned; it is cancelled once every requester has left
+@video_enhanced_bp.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_download_job(job_id):
+    job = download_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.finished:
+        return jsonify({"error": f"Job already {job.status}"}), 409
+    if not download_queue.detach(job_id, request.args.get("requester")):
+        return jsonify({"error": "Not a requester of this job, or already detached"}), 404
+    return jsonify(job.to_dict())
 
 
 # Stream/serve file
 @video_enhanced_bp.route("/stream/<filename>", methods=["GET"])
+@no_compress
 def stream_video(filename):
-    filepath = os.path.join(DOWNLOAD_DIR, filename)
+    try:
+        filepath = storage.path_for(filename)
+    except ValueError:
+        return jsonify({"error": "File not found"}), 404
     if not os.path.exists(filepath):
         return jsonify({"error": "File not found"}), 404
-    return send_file(filepath, as_attachment=False)
+    storage.touch(filename)
+    if STREAM_OFFLOAD:
+        return _offload_file(filepath)
+    return send_file_range(filepath)
+
+
+# Hand a stored file to the front proxy (STREAM_OFFLOAD) instead of sending it
+def _offload_file(filepath):
+    internal_uri = STREAM_OFFLOAD_PREFIX + os.path.relpath(filepath, DOWNLOAD_DIR).replace(os.sep, "/")
+    return offload_response(STREAM_OFFLOAD, filepath, internal_uri)
+
+
+# Proxied thumbnail at a fixed width (?w= picks the nearest size at or above it)
+@video_enhanced_bp.route("/thumbnail/<key>", methods=["GET"])
+def get_thumbnail(key):
+    if len(key) != 40 or not all(c in "0123456789abcdef" for c in key):
+        return jsonify({"error": "Thumbnail not found"}), 404
+    width = thumbnails.width_for(request.args.get("w", type=int))
+    try:
+        found = thumbnails.path_for(key, width)
+    except ThumbnailError as e:
+        return jsonify({"error": str(e)}), 502
+    if found is None:
+        return jsonify({"error": "Thumbnail not found"}), 404
+    path, mimetype = found
+    return send_file_range(path, mimetype, max_age=THUMBNAIL_HTTP_MAX_AGE)
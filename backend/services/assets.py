@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, abort, request
+
+from services.streaming import send_file_range
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unhashed names may change under the same URL, so make clients revalidate
+REVALIDATE = "no-cache"
+
+# Assets above this size are served from disk (with sendfile) instead of RAM
+MEMORY_LIMIT = int(os.environ.get("ASSET_MEMORY_LIMIT", 1024 * 1024))
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# href="x", src="x" and url(x) references to other assets in HTML and CSS
+REFERENCE = re.compile(r"""((?:href|src)\s*=\s*["']|url\(\s*["']?)([^"'()\s?#]+)""")
+
+
+class Asset:
+    def __init__(self, name, path, body, mtime):
+        self.name = name
+        self.path = path
+        self.size = len(body)
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        digest = hashlib.sha256(body).hexdigest()
+        self.etag = digest[:20]
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{digest[:10]}{ext}"
+        self.mtime = mtime
+        self.body = body if self.size <= MEMORY_LIMIT else None
+        self.encodings = {}
+        if self.body is not None and self.size >= COMPRESS_MIN_SIZE \
+                and self.mimetype.startswith(COMPRESSIBLE):
+            self._compress()
+
+    def _compress(self):
+        candidates = {"gzip": gzip.compress(self.body, 9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(self.body, quality=11)
+        for encoding, data in candidates.items():
+            # Not worth a Vary variant unless it saves a tenth
+            if len(data) < self.size * 0.9:
+                self.encodings[encoding] = data
+
+
+def _rewrite_order(name):
+    """0 for leaf assets, then CSS (may reference images), then HTML"""
+    return 2 if name.endswith(".html") else 1 if name.endswith(".css") else 0
+
+
+class StaticAssets:
+    """In-memory manifest of the frontend's static files.
+
+    The folder is read once: each file gets a content hash, text assets are
+    pre-compressed with gzip (and brotli when installed), and references
+    between HTML/CSS and other assets are rewritten to the hashed names, so
+    those URLs can be cached forever. ``index.html`` doubles as the SPA
+    fallback and is answered from memory. With ``auto_reload`` the folder
+    is rescanned on each request and the manifest rebuilt when it changed.
+    """
+
+    def __init__(self, root, index="index.html", auto_reload=False):
+        self.root = root
+        self.index = index
+        self.auto_reload = auto_reload
+        self._lock = threading.Lock()
+        self._signature = None
+        self.assets = {}
+        self.hashed = {}
+        self.load()
+
+    def _scan(self):
+        files = {}
+        if not os.path.isdir(self.root):
+            return files
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                files[name] = (path, os.stat(path).st_mtime_ns)
+        return files
+
+    def load(self):
+        files = self._scan()
+        signature = sorted(files.items())
+        if signature == self._signature:
+            return
+        sources = {}
+        for name, (path, mtime) in files.items():
+            with open(path, "rb") as f:
+                sources[name] = (path, f.read(), mtime)
+
+        # Hash what others reference before rewriting the referencing files
+        assets = {}
+        for name in sorted(sources, key=_rewrite_order):
+            path, body, mtime = sources[name]
+            if _rewrite_order(name):
+                body = self._rewrite(name, body, assets)
+            assets[name] = Asset(name, path, body, mtime)
+
+        with self._lock:
+            self.assets = assets
+            self.hashed = {asset.hashed_name: asset for asset in assets.values()}
+            self._signature = signature
+
+    def _rewrite(self, name, body, assets):
+        base = os.path.dirname(name)
+
+        def replace(match):
+            target = os.path.normpath(os.path.join(base, match.group(2))).replace(os.sep, "/")
+            asset = assets.get(target)
+            if asset is None:
+                return match.group(0)
+            relative = os.path.relpath(asset.hashed_name, base or ".").replace(os.sep, "/")
+            return match.group(1) + relative
+
+        return REFERENCE.sub(replace, body.decode("utf-8")).encode("utf-8")
+
+    def serve(self, path):
+        """Response for ``path``: a hashed asset, a plain asset or the SPA index"""
+        if self.auto_reload:
+            self.load()
+        if path in self.hashed:
+            return self._respond(self.hashed[path], IMMUTABLE)
+        asset = self.assets.get(path) or self.assets.get(self.index)
+        if asset is None:
+            abort(404)
+        return self._respond(asset, REVALIDATE)
+
+    def _respond(self, asset, cache_control):
+        if asset.body is None:
+            response = send_file_range(asset.path, asset.mimetype)
+            response.headers["Cache-Control"] = cache_control
+            return response
+
+        encoding = next((e for e in ("br", "gzip") if e in asset.encodings
+                         and request.accept_encodings[e]), None)
+        body = asset.encodings[encoding] if encoding else asset.body
+        response = Response(body, mimetype=asset.mimetype)
+        response.set_etag(f"{asset.etag}-{encoding}" if encoding else asset.etag)
+        response.last_modified = asset.mtime / 1e9
+        response.headers["Cache-Control"] = cache_control
+        if asset.encodings:
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.content_encoding = encoding
+        return response.make_conditional(request)
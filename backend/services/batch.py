@@ -0,0 +1,31 @@
+import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+def stream_ndjson(executor, tasks, max_in_flight):
+    """Run ``tasks`` on ``executor`` and yield NDJSON lines as they finish.
+
+    A task is a callable returning ``(items, followups)``: ``items`` are
+    dicts written out as one JSON line each and ``followups`` are further
+    tasks to schedule (e.g. the entries of an expanded playlist). At most
+    ``max_in_flight`` tasks of this stream run at once, so one large batch
+    cannot take over the shared executor. Tasks are expected to report
+    their own errors as items rather than raise.
+    """
+    queue = deque(tasks)
+    pending = set()
+    try:
+        while queue or pending:
+            while queue and len(pending) < max_in_flight:
+                pending.add(executor.submit(queue.popleft()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                items, followups = future.result()
+                for item in items:
+                    yield json.dumps(item) + "\n"
+                queue.extend(followups)
+    finally:
+        # The client went away: drop whatever has not started yet
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,78 @@
+import gzip
+import os
+from functools import wraps
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESSIBLE = ("text/", "application/json", "application/javascript",
+                "application/xml", "image/svg+xml")
+
+# Cheap levels: these run per response, unlike the pre-compressed assets
+ENCODERS = {"gzip": lambda data: gzip.compress(data, 6)}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=5)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda data: zstandard.ZstdCompressor(level=3).compress(data)
+PREFERENCE = ("zstd", "br", "gzip")
+
+
+def no_compress(view):
+    """Exclude a view's responses from on-the-fly compression"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.no_compress = True
+    return wrapper
+
+
+def negotiate(accept_encodings):
+    """Best supported encoding for a parsed Accept-Encoding header, or None"""
+    accepted = [e for e in PREFERENCE if e in ENCODERS and accept_encodings[e]]
+    return max(accepted, key=lambda e: accept_encodings[e], default=None)
+
+
+def init_compression(app, min_size=COMPRESS_MIN_SIZE):
+    """Compress buffered text responses above ``min_size`` bytes.
+
+    Streamed bodies (NDJSON, SSE, file transfers), partial and empty
+    responses, and anything already encoded pass through untouched, as do
+    views marked with ``@no_compress``. Strong ETags are weakened since the
+    encoded bytes differ; If-None-Match uses the weak comparison anyway.
+    """
+    @app.after_request
+    def compress(response):
+        view = app.view_functions.get(request.endpoint)
+        if (getattr(view, "no_compress", False)
+                or request.method == "HEAD"
+                or response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(ENCODERS[encoding](data))
+        response.content_encoding = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,99 @@
+def _has_video(f):
+    return f.get("vcodec") != "none" and bool(f.get("height"))
+
+
+def _has_audio(f):
+    return f.get("acodec") != "none"
+
+
+def _bitrate(f, *fields):
+    for field in fields:
+        if f.get(field):
+            return f[field]
+    return 0
+
+
+def _filesize(f, duration):
+    size = f.get("filesize") or f.get("filesize_approx")
+    if not size and duration and f.get("tbr"):
+        size = int(f["tbr"] * 1000 / 8 * duration)
+    return size
+
+
+def _best_audio(audio, video_ext):
+    # Prefer audio that muxes into the video's container without re-encoding
+    preferred = "m4a" if video_ext == "mp4" else "webm"
+    matching = [f for f in audio if f.get("ext") == preferred]
+    return max(matching or audio, key=lambda f: _bitrate(f, "abr", "tbr"), default=None)
+
+
+def build_ladder(formats, duration=None):
+    """Collapse yt-dlp formats into one download option per resolution/fps.
+
+    Each rung names a ready-made format spec: either the best muxed format
+    or the best video-only format paired with a compatible audio track,
+    whichever carries more video bitrate (muxed wins ties since it needs
+    no merge). An ``audio`` rung with the best audio-only format is added
+    when one exists. Rungs are ordered best first.
+    """
+    audio = [f for f in formats if _has_audio(f) and f.get("vcodec") == "none"]
+    rungs = {}
+    for f in formats:
+        if not _has_video(f):
+            continue
+        fps = int(f.get("fps") or 0)
+        key = f"{f['height']}p{fps if fps > 30 else ''}"
+        if _has_audio(f):
+            spec, audio_f, ext = f["format_id"], None, f.get("ext")
+        else:
+            audio_f = _best_audio(audio, f.get("ext"))
+            if audio_f is None:
+                continue
+            spec = f"{f['format_id']}+{audio_f['format_id']}"
+            ext = {("mp4", "m4a"): "mp4", ("webm", "webm"): "webm"}.get(
+                (f.get("ext"), audio_f.get("ext")), "mkv")
+
+        vbr = _bitrate(f, "vbr", "tbr")
+        current = rungs.get(key)
+        if current is not None and (current["_vbr"], current["_muxed"]) >= (vbr, audio_f is None):
+            continue
+
+        size = _filesize(f, duration)
+        if audio_f is not None and size:
+            size += _filesize(audio_f, duration) or 0
+        rungs[key] = {
+            "key": key,
+            "format": spec,
+            "height": f["height"],
+            "fps": f.get("fps"),
+            "ext": ext,
+            "vcodec": f.get("vcodec"),
+            "acodec": (audio_f or f).get("acodec"),
+            "tbr": (f.get("tbr") or 0) + ((audio_f or {}).get("tbr") or 0) or None,
+            "filesize": size,
+            "_vbr": vbr,
+            "_muxed": audio_f is None,
+        }
+
+    ladder = sorted(rungs.values(), key=lambda r: (r["height"], r["fps"] or 0, r["_vbr"]), reverse=True)
+    for rung in ladder:
+        del rung["_vbr"], rung["_muxed"]
+
+    best_audio = max(audio, key=lambda f: _bitrate(f, "abr", "tbr"), default=None)
+    if best_audio is not None:
+        ladder.append({
+            "key": "audio",
+            "format": best_audio["format_id"],
+            "height": None,
+            "fps": None,
+            "ext": best_audio.get("ext"),
+            "vcodec": None,
+            "acodec": best_audio.get("acodec"),
+            "tbr": best_audio.get("tbr"),
+            "filesize": _filesize(best_audio, duration),
+        })
+    return ladder
+
+
+def find_rung(ladder, key):
+    return next((rung for rung in ladder or [] if rung["key"] == key), None)
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import select
+
+from models.user import db
+from models.video import CachedVideoInfo
+
+# Query parameters that never change what an extractor returns
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "igshid", "pp", "ref"}
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"}
+
+
+def canonicalize_url(url):
+    """Normalise a video URL so equivalent links share one cache entry"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    path = parts.path or "/"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in TRACKING_PARAMS and not k.startswith("utm_")]
+
+    # Fold YouTube's short and mobile link forms into the watch URL
+    if host == "youtu.be" and path.strip("/"):
+        query.append(("v", path.strip("/")))
+        host, path = "www.youtube.com", "/watch"
+    elif host in YOUTUBE_HOSTS:
+        if path.startswith("/shorts/"):
+            query.append(("v", path[len("/shorts/"):].strip("/")))
+            path = "/watch"
+        host = "www.youtube.com"
+
+    netloc = host if parts.port is None else f"{host}:{parts.port}"
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ""))
+
+
+class DatabaseTier:
+    """Stores cached payloads in the app database so they survive restarts.
+
+    Every ``prune_every`` saves, expired rows are deleted and the table is
+    cut back to ``max_rows``, dropping the entries closest to expiry.
+    """
+
+    def __init__(self, max_rows=10000, prune_every=100):
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self._saves = 0
+
+    def load(self, key):
+        row = db.session.get(CachedVideoInfo, key)
+        if row is None or row.expires_at <= time.time():
+            return None
+        return json.loads(row.payload)
+
+    def save(self, key, value, ttl):
+        try:
+            db.session.merge(CachedVideoInfo(key=key, payload=json.dumps(value),
+                                             expires_at=time.time() + ttl))
+            self._saves += 1
+            if self._saves % self.prune_every == 0:
+                self._prune()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    def _prune(self):
+        CachedVideoInfo.query.filter(CachedVideoInfo.expires_at <= time.time()).delete()
+        excess = CachedVideoInfo.query.count() - self.max_rows
+        if excess > 0:
+            doomed = select(CachedVideoInfo.key).order_by(CachedVideoInfo.expires_at).limit(excess)
+            CachedVideoInfo.query.filter(CachedVideoInfo.key.in_(doomed)).delete(
+                synchronize_session=False)
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class InfoCache:
+    """TTL + LRU cache for trimmed /info payloads with single-flight loading.
+
+    Concurrent misses for the same canonical URL wait on the first caller's
+    extraction instead of starting their own. Failed extractions are not
+    cached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600, store=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persistent_hits = 0
+
+    def get(self, url, loader):
+        """Return the cached payload for ``url``, calling ``loader(url)`` on a miss"""
+        key = canonicalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self.store.load(key) if self.store else None
+            if value is not None:
+                self.persistent_hits += 1
+            else:
+                value = loader(url)
+                if self.store:
+                    self.store.save(key, value, self.ttl)
+            self._put(key, value)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def put(self, url, value):
+        """Seed the cache with a payload obtained elsewhere (e.g. a batch listing)"""
+        self._put(canonicalize_url(url), value)
+
+    def peek(self, url):
+        """Return the in-memory payload for ``url`` without loading or counting"""
+        entry = self._entries.get(canonicalize_url(url))
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def invalidate(self, url):
+        with self._lock:
+            self._entries.pop(canonicalize_url(url), None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "persistent_hits": self.persistent_hits,
+        }
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
@@ -0,0 +1,265 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs"""
+
+
+class DownloadJob:
+    """State of a single download, updated from yt-dlp progress hooks.
+
+    Every published change bumps ``version`` and wakes watchers blocked in
+    ``wait_for_change()``. Progress updates are published at most once per
+    ``event_interval`` seconds, so watchers see a coalesced stream no
+    matter how often yt-dlp calls its hooks; status changes always go out.
+    """
+
+    event_interval = 0.5
+
+    def __init__(self, url, format_id, key=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.format_id = format_id
+        self.key = key
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.postprocessor = None
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.speed = None
+        self.eta = None
+        self.filename = None
+        self.profile = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.continuation = None
+        self._requesters = set()
+        self._cancel_event = threading.Event()
+        self._changed = threading.Condition()
+        self._last_published = 0.0
+        self.version = 0
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def requesters(self):
+        return len(self._requesters)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def update_progress(self, d):
+        """Copy the interesting fields of a yt-dlp progress dict onto the job"""
+        self.stage = "downloading"
+        self.downloaded_bytes = d.get("downloaded_bytes") or self.downloaded_bytes
+        self.total_bytes = d.get("total_bytes") or d.get("total_bytes_estimate") or self.total_bytes
+        self.speed = d.get("speed")
+        self.eta = d.get("eta")
+        self._publish(force=d.get("status") == "finished")
+
+    def update_postprocessor(self, d):
+        """Track yt-dlp postprocessor hooks (merging, remuxing, ...)"""
+        self.stage = "postprocessing"
+        self.postprocessor = d.get("postprocessor")
+        self._publish(force=d.get("status") != "processing")
+
+    def set_status(self, status):
+        self.status = status
+        self.stage = status
+        if status in FINISHED_STATES:
+            self.finished_at = time.time()
+        elif status == RUNNING:
+            self.started_at = time.time()
+        self._publish(force=True)
+
+    def wait_for_change(self, version, timeout):
+        """Block until ``version`` is outdated or ``timeout`` passes; returns the latest"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def _publish(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_published < self.event_interval:
+            return
+        self._last_published = now
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "url": self.url,
+            "format_id": self.format_id,
+            "profile": self.profile,
+            "status": self.status,
+            "stage": self.stage,
+            "postprocessor": self.postprocessor,
+            "downloaded_bytes": self.downloaded_bytes,
+            "total_bytes": self.total_bytes,
+            "speed": self.speed,
+            "eta": self.eta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "requesters": self.requesters,
+        }
+        if self.status == DONE:
+            data["filename"] = self.filename
+            data["download_url"] = f"/api/video/stream/{self.filename}"
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Bounded worker pool running download jobs in the background.
+
+    ``max_workers`` caps concurrent downloads and ``max_queued`` caps jobs
+    waiting for a free worker; finished jobs are kept for ``retention``
+    seconds so clients can still read their final status. Jobs submitted
+    with a ``key`` already held by an unfinished job attach to that job
+    instead of running again. Each submit hands out its own requester
+    handle, and ``detach()`` only cancels a shared job once every handle has
+    let go of it. A job function may return a Future to hand
+    the rest of the job to another executor (e.g. a transcode pool); the
+    worker is freed and the job finishes when that Future does.
+    """
+
+    def __init__(self, max_workers=4, max_queued=32, retention=3600, event_interval=0.5):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.event_interval = event_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="download")
+        self._jobs = {}
+        self._active = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, job, fn):
+        """Queue ``fn(job)`` for execution, raising QueueFull when saturated.
+
+        Returns ``(job, requester)``: the job that will produce the result,
+        which is an already running job when one with the same key is in
+        flight, and the caller's handle for ``detach()``.
+        """
+        requester = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            existing = self._active.get(job.key) if job.key is not None else None
+            if existing is not None and not existing.cancel_requested:
+                existing._requesters.add(requester)
+                return existing, requester
+            if self._pending >= self.max_queued:
+                raise QueueFull("Download queue is full, try again later")
+            self._pending += 1
+            job.event_interval = self.event_interval
+            job._requesters.add(requester)
+            self._jobs[job.id] = job
+            if job.key is not None:
+                self._active[job.key] = job
+        job.future = self._executor.submit(self._run, job, fn)
+        return job, requester
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def find_active(self, key):
+        """Return the unfinished job holding ``key``, if any"""
+        return self._active.get(key)
+
+    def detach(self, job_id, requester):
+        """Drop ``requester``'s hold on a job, cancelling it when none are
+        left; False if that handle was not attached (e.g. already detached)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or requester not in job._requesters:
+                return False
+            job._requesters.discard(requester)
+            if job._requesters or job.finished:
+                return True
+        self.cancel(job_id)
+        return True
+
+    def cancel(self, job_id):
+        """Cancel a job; queued jobs are dropped, running ones stop at the next hook"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job._cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            with self._lock:
+                self._pending -= 1
+                self._release(job)
+            job.set_status(CANCELLED)
+        elif job.continuation is not None:
+            job.continuation.cancel()
+        return job
+
+    def _run(self, job, fn):
+        with self._lock:
+            self._pending -= 1
+        if job.cancel_requested:
+            with self._lock:
+                self._release(job)
+            job.set_status(CANCELLED)
+            return
+        job.set_status(RUNNING)
+        try:
+            continuation = fn(job)
+        except Exception as e:
+            self._finish(job, e)
+            return
+        if isinstance(continuation, Future):
+            job.continuation = continuation
+            continuation.add_done_callback(
+                lambda f: self._finish(job, None if f.cancelled() else f.exception()))
+            return
+        self._finish(job)
+
+    def _finish(self, job, error=None):
+        if job.cancel_requested:
+            status = CANCELLED
+        elif error is not None:
+            status = FAILED
+            job.error = str(error)
+        else:
+            status = DONE
+        with self._lock:
+            self._release(job)
+        job.set_status(status)
+
+    def _release(self, job):
+        if job.key is not None and self._active.get(job.key) is job:
+            del self._active[job.key]
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,222 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucket counts are stored per bucket and summed up only when rendered"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, ([*counts], total, count))
+                           for labels, (counts, total, count) in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket"
+                             f"{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Minimal Prometheus registry; values are per process (per gunicorn worker)"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, fn):
+        """Register ``fn()`` to refresh gauges right before each scrape"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by endpoint and status", ("method", "endpoint", "status"))
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time until the view returned its response",
+    ("method", "endpoint"))
+http_response_size = registry.histogram(
+    "http_response_size_bytes", "Response body size when known up front",
+    ("endpoint",), SIZE_BUCKETS)
+http_in_flight = registry.gauge("http_requests_in_flight", "Requests being handled")
+sql_queries = registry.histogram(
+    "http_request_sql_queries", "SQL statements executed per request", ("endpoint",), QUERY_COUNT_BUCKETS)
+sql_duration = registry.histogram(
+    "sql_query_duration_seconds", "SQL statement execution time", ("statement",),
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+ytdlp_phase = registry.histogram(
+    "ytdlp_phase_seconds", "yt-dlp time by phase (info, extract, download, postprocess)",
+    ("phase",), PHASE_BUCKETS)
+
+
+# The start time lives on the statement's execution context, which is
+# dropped with it whether the statement succeeds or fails
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    _record_query(exception_context.execution_context, exception_context.statement)
+
+
+def _record_query(context, statement):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    del context._query_start
+    statement = statement or ""
+    sql_duration.observe(time.perf_counter() - start,
+                         statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "")
+    if has_request_context():
+        g._sql_queries = g.get("_sql_queries", 0) + 1
+
+
+def init_metrics(app, path="/metrics"):
+    """Time every request and serve the registry at ``path``.
+
+    Latency is measured until the view returns, so for streamed responses
+    it covers setup only, not the transfer.
+    """
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+        g._in_flight = True
+        http_in_flight.inc()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("_request_start", None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or "unmatched"
+        http_latency.observe(time.perf_counter() - start, request.method, endpoint)
+        http_requests.inc(request.method, endpoint, str(response.status_code))
+        if response.content_length is not None:
+            http_response_size.observe(response.content_length, endpoint)
+        sql_queries.observe(g.pop("_sql_queries", 0), endpoint)
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        if g.pop("_in_flight", False):
+            http_in_flight.dec()
+
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule(path, "metrics", metrics)
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_progressive(info):
+    """True when the selected format is a single plain HTTP(S) file"""
+    return ("requested_formats" not in info and info.get("url")
+            and info.get("protocol") in ("http", "https"))
+
+
+def http_chunks(ydl, info):
+    """Yield the selected progressive format straight from its origin.
+
+    Uses the extractor's own opener so cookies, proxies and the per-format
+    HTTP headers match what yt-dlp itself would send. Chunks are only read
+    when the client asks for the next one, so a slow client slows the fetch
+    instead of buffering the file in memory.
+    """
+    from yt_dlp.networking import Request
+
+    response = ydl.urlopen(Request(info["url"], headers=info.get("http_headers")))
+    try:
+        while chunk := response.read(CHUNK_SIZE):
+            yield chunk
+    finally:
+        response.close()
+
+
+def subprocess_chunks(url, format_id):
+    """Yield yt-dlp's ``-o -`` output for formats that need its downloader"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "yt_dlp", "--quiet", "--no-progress",
+         "-f", format_id, "-o", "-", url],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while chunk := proc.stdout.read1(CHUNK_SIZE):
+            yield chunk
+        if proc.wait() != 0:
+            raise RuntimeError(f"yt-dlp exited with status {proc.returncode}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+
+def tee(chunks, path, on_complete=None):
+    """Pass ``chunks`` through while writing them to ``path``.
+
+    The copy is written to a unique ``.part`` file and only renamed into
+    place once the stream finished, so aborted transfers never leave a
+    truncated file behind.
+    """
+    part = f"{path}.{uuid.uuid4().hex}.part"
+    out = open(part, "wb")
+    complete = False
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            yield chunk
+        complete = True
+    finally:
+        chunks.close()
+        out.close()
+        if complete:
+            os.replace(part, path)
+            if on_complete:
+                on_complete()
+        else:
+            os.remove(part)
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# name -> (extension, ffmpeg muxer, output options)
+PROFILES = {
+    "remux-mp4": ("mp4", "mp4", ["-map", "0:v?", "-map", "0:a?", "-c", "copy",
+                                 "-movflags", "+faststart"]),
+    "remux-mkv": ("mkv", "matroska", ["-map", "0", "-c", "copy"]),
+    "h264-mp4": ("mp4", "mp4", ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+                                "-c:a", "aac", "-b:a", "160k", "-movflags", "+faststart"]),
+    "audio-mp3": ("mp3", "mp3", ["-vn", "-c:a", "libmp3lame", "-q:a", "2"]),
+    "audio-m4a": ("m4a", "ipod", ["-vn", "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart"]),
+}
+
+
+class ProcessSpec:
+    """A profile plus an optional ``start``/``end`` trim window in seconds.
+
+    ``key`` names the result for caching, e.g. ``audio-mp3`` or
+    ``audio-mp3@10-25.5``. Trims with the copying profiles cut at the
+    nearest keyframes; the encoding profiles cut exactly.
+    """
+
+    def __init__(self, profile, start=None, end=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile} (expected one of {', '.join(PROFILES)})")
+        if (start is not None and start < 0) or (end is not None and end <= (start or 0)):
+            raise ValueError("Trim window must satisfy 0 <= start < end")
+        self.profile = profile
+        self.start = start
+        self.end = end
+        self.ext, self.muxer, self.options = PROFILES[profile]
+
+    @classmethod
+    def from_request(cls, data):
+        """Build a spec from ``{"profile", "start", "end"}``; ValueError if invalid"""
+        if not isinstance(data, dict):
+            raise ValueError("postprocess must be an object with a profile")
+        try:
+            start, end = (None if data.get(k) is None else float(data[k]) for k in ("start", "end"))
+        except (TypeError, ValueError) as e:
+            raise ValueError("start and end must be numbers") from e
+        return cls(data.get("profile"), start, end)
+
+    @property
+    def key(self):
+        if self.start is None and self.end is None:
+            return self.profile
+        return f"{self.profile}@{_seconds(self.start or 0)}-{_seconds(self.end) if self.end else ''}"
+
+    def output_name(self, source):
+        """Content-addressed file name for this spec applied to ``source``"""
+        return f"{hashlib.sha1(f'{source}:{self.key}'.encode()).hexdigest()}.{self.ext}"
+
+    def command(self, ffmpeg, source):
+        """ffmpeg arguments up to, but not including, the output path"""
+        cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y"]
+        if self.start:
+            cmd += ["-ss", _seconds(self.start)]
+        if self.end is not None:
+            cmd += ["-to", _seconds(self.end)]
+        return cmd + ["-i", source, *self.options, "-f", self.muxer]
+
+
+def _seconds(value):
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def run_ffmpeg(cmd, target, timeout, should_stop=None):
+    """Run ``cmd`` into a unique ``.part`` file and move it over ``target``;
+    returns the output size. ffmpeg is killed if ``should_stop()`` turns true."""
+    tmp = f"{target}.{uuid.uuid4().hex}.part"
+    proc = subprocess.Popen(cmd + [tmp], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                _, stderr = proc.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if should_stop is not None and should_stop():
+                    raise TranscodeCancelled("Processing cancelled")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"ffmpeg timed out after {timeout} s")
+        if proc.returncode != 0:
+            message = stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(f"ffmpeg failed: {message[-1] if message else proc.returncode}")
+        os.replace(tmp, target)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return os.path.getsize(target)
+
+
+class TranscodeCancelled(Exception):
+    pass
+
+
+class Transcoder:
+    """ffmpeg runs on a bounded pool of their own, apart from the download workers.
+
+    Each run is a separate ffmpeg process, so encoding uses every core
+    without the GIL in the way; ``max_workers`` caps how many run at once,
+    and CPU-heavy transcodes queue here instead of taking download workers.
+    The threads only wait on ffmpeg.
+    """
+
+    def __init__(self, max_workers=2, ffmpeg=None, timeout=3600):
+        self.max_workers = max_workers
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg") or "ffmpeg"
+        self.timeout = timeout
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="transcode")
+        self._lock = threading.Lock()
+
+    def submit(self, spec, source, target, then=None, should_stop=None):
+        """Run ``spec`` on ``source`` into ``target``.
+
+        Returns a Future for the output size that resolves after
+        ``then(size)`` has run. A queued run can be cancelled through the
+        Future; a running one stops once ``should_stop()`` is true.
+        """
+        with self._lock:
+            self.active += 1
+        future = self._executor.submit(self._run, spec.command(self.ffmpeg, source),
+                                       target, then, should_stop)
+        future.add_done_callback(self._done)
+        return future
+
+    def _run(self, cmd, target, then, should_stop):
+        size = run_ffmpeg(cmd, target, self.timeout, should_stop)
+        if then is not None:
+            then(size)
+        return size
+
+    def _done(self, future):
+        with self._lock:
+            self.active -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def stats(self):
+        return {"workers": self.max_workers, "active": self.active,
+                "completed": self.completed, "failed": self.failed}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
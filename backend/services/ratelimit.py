@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import Response, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = "Rate limit exceeded, slow down"
+
+
+class MemoryBackend:
+    """Buckets in this process only; each worker enforces its own limit"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(rate, burst, now)
+        return allowed, tokens
+
+    def _prune(self, rate, burst, now):
+        # A bucket that has refilled is the same as no bucket
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * rate >= burst:
+                del self._buckets[key]
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets ("
+                         "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row or (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+
+class RedisBackend:
+    """Buckets in Redis (or Valkey/KeyDB), updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client, prefix="ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst, cost, now):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, burst, cost, now])
+        return bool(allowed), float(tokens)
+
+
+def backend_from_url(url):
+    """``memory`` (default), ``sqlite:///path`` or ``redis://host:port/db``"""
+    if not url or url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        return RedisBackend(redis.Redis.from_url(url))
+    raise ValueError(f"Unsupported rate limit backend: {url}")
+
+
+def parse_limit(value):
+    """``"30/60"`` -> 30 requests per 60 seconds, i.e. (0.5 tokens/s, burst 30)"""
+    count, _, period = value.partition("/")
+    count, period = float(count), float(period or 1)
+    return count / period, count
+
+
+def _too_many(message, retry_after, status):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = status
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def too_costly(cost, burst):
+    return f"Request counts as {cost} requests but the rate limit allows {burst:g}; split it up"
+
+
+def client_key(headers, remote_addr):
+    """Bucket owner: the hashed ``X-API-Key`` header, else the remote address"""
+    api_key = headers.get("X-API-Key")
+    if api_key:
+        return "key:" + hashlib.sha1(api_key.encode()).hexdigest()
+    return "ip:" + (remote_addr or "unknown")
+
+
+class RateLimiter:
+    """Token buckets per client and limit name.
+
+    Clients are identified by ``client_key()``; behind a proxy, set
+    PROXY_HOPS so ``remote_addr`` is the real client. If the backend is
+    unreachable requests are let through rather than failing the whole API.
+    """
+
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = limits
+
+    def retry_after(self, name, client, cost=1):
+        """Spend ``cost`` tokens of ``client``'s ``name`` bucket; None if
+        admitted, else the seconds until enough tokens are back (``math.inf``
+        when ``cost`` exceeds the whole bucket, so waiting cannot help)"""
+        limit = self.limits.get(name)
+        if limit is None:
+            return None
+        rate, burst = limit
+        if cost > burst:
+            return math.inf
+        try:
+            allowed, tokens = self.backend.take(f"{name}:{client}", rate, burst, cost, time.time())
+        except Exception:
+            logger.exception("Rate limit backend failed; admitting request")
+            return None
+        return None if allowed else (cost - tokens) / rate
+
+    def check(self, name, cost=1):
+        """None if the current Flask request is admitted, else a 429 response"""
+        wait = self.retry_after(name, client_key(request.headers, request.remote_addr), cost)
+        if wait is None:
+            return None
+        if wait == math.inf:
+            response = jsonify({"error": too_costly(cost, self.limits[name][1])})
+            response.status_code = 429
+            return response
+        return _too_many(RATE_LIMITED, wait, 429)
+
+    def limit(self, name, cost=None):
+        """Decorator; ``cost`` is an optional callable giving tokens per request"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                rejected = self.check(name, cost() if cost else 1)
+                return rejected or view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+class LoadShedder:
+    """Reject work up front with 503 + Retry-After when the box is saturated.
+
+    A guarded view is refused while ``max_inflight`` guarded requests are
+    already running, while the 1-minute load average per CPU is above
+    ``max_load``, or (for views guarding ``queue``) while the job queue is
+    full, instead of queueing behind work that cannot finish soon.
+    """
+
+    def __init__(self, max_inflight=32, max_load=0, retry_after=30):
+        self.max_inflight = max_inflight
+        self.max_load = max_load
+        self.retry_after = retry_after
+        self.inflight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def _overloaded(self, queue):
+        if self.max_load and hasattr(os, "getloadavg"):
+            if os.getloadavg()[0] / (os.cpu_count() or 1) > self.max_load:
+                return "Server is under heavy load"
+        if queue is not None and queue.pending >= queue.max_queued:
+            return "Download queue is full"
+        return None
+
+    def admit(self, queue=None):
+        """Count a request in, or return why it is refused; pair with ``release()``"""
+        with self._lock:
+            reason = ("Too many requests in progress"
+                      if self.inflight >= self.max_inflight else self._overloaded(queue))
+            if reason is None:
+                self.inflight += 1
+                return None
+            self.shed += 1
+        return f"{reason}, try again later"
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def guard(self, queue=None):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                reason = self.admit(queue)
+                if reason is not None:
+                    return _too_many(reason, self.retry_after, 503)
+                try:
+                    response = view(*args, **kwargs)
+                except BaseException:
+                    self.release()
+                    raise
+                # A streamed body does its work after the view returns
+                if isinstance(response, Response) and response.is_streamed:
+                    response.call_on_close(self.release)
+                else:
+                    self.release()
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+
+# Leftovers of interrupted yt-dlp runs
+PARTIAL_SUFFIXES = (".part", ".ytdl", ".temp")
+
+
+class StorageManager:
+    """Sharded downloads directory with quota and age based eviction.
+
+    Files live under ``root/<aa>/<bb>/<name>`` where ``aa``/``bb`` are the
+    first characters of the (hash-derived) name, which keeps every directory
+    small. Last access is recorded as the file's atime by ``touch()``; the
+    sweeper evicts the least recently used files until usage drops under
+    ``quota_bytes`` and removes files idle longer than ``max_age``.
+    """
+
+    def __init__(self, root, quota_bytes, max_age=0, sweep_interval=300,
+                 part_grace=3600, on_evict=None):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.part_grace = part_grace
+        self.on_evict = on_evict
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.removed_partials = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, filename, create=False):
+        """Absolute location of ``filename`` inside its shard"""
+        if not filename or filename != os.path.basename(filename) or filename.startswith("."):
+            raise ValueError(f"Invalid file name: {filename!r}")
+        shard = os.path.join(self.root, filename[:2], filename[2:4])
+        if create:
+            os.makedirs(shard, exist_ok=True)
+        return os.path.join(shard, filename)
+
+    def exists(self, filename):
+        return os.path.isfile(self.path_for(filename))
+
+    def touch(self, filename):
+        """Record an access so LRU eviction keeps recently served files"""
+        path = self.path_for(filename)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def remove(self, filename):
+        path = self.path_for(filename)
+        for candidate in (path,) + tuple(path + s for s in PARTIAL_SUFFIXES):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+    def remove_stem(self, stem):
+        """Remove every ``stem.*`` file, whatever its extension"""
+        shard = os.path.dirname(self.path_for(stem))
+        try:
+            names = os.listdir(shard)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(stem + "."):
+                self._unlink(os.path.join(shard, name))
+
+    def sweep(self):
+        """Drop stale partial files, then evict by age and quota"""
+        now = time.time()
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(PARTIAL_SUFFIXES):
+                    if now - st.st_mtime > self.part_grace:
+                        self._unlink(path)
+                        self.removed_partials += 1
+                    continue
+                files.append((st.st_atime, st.st_size, name, path))
+
+        files.sort()
+        usage = sum(size for _, size, _, _ in files)
+        for atime, size, name, path in files:
+            expired = self.max_age and now - atime > self.max_age
+            if not expired and usage <= self.quota_bytes:
+                break
+            if self._unlink(path):
+                usage -= size
+                self.evicted_files += 1
+                self.evicted_bytes += size
+                if self.on_evict:
+                    self.on_evict(name)
+        return usage
+
+    def start(self, app):
+        """Run ``sweep()`` every ``sweep_interval`` seconds on a daemon thread.
+
+        Safe to call repeatedly; a process forked after the thread started
+        (gunicorn ``--preload``) starts its own.
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, args=(app,),
+                                            name="storage-sweeper", daemon=True)
+            self._thread.start()
+
+    def _loop(self, app):
+        while not self._stop.wait(self.sweep_interval):
+            with app.app_context():
+                try:
+                    self.sweep()
+                except Exception:
+                    app.logger.exception("Download storage sweep failed")
+
+    def stop(self):
+        self._stop.set()
+
+    def _unlink(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
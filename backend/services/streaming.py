@@ -0,0 +1,124 @@
+import mimetypes
+import os
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+BLOCK_SIZE = 64 * 1024
+
+
+def file_etag(st):
+    """Strong validator derived from inode, size and mtime"""
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def _read_range(f, length):
+    try:
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _not_modified(etag, mtime, if_none_match, if_modified_since):
+    if if_none_match:
+        return if_none_match.contains(etag)
+    if if_modified_since:
+        return int(mtime) <= if_modified_since.timestamp()
+    return False
+
+
+def _range_applies(etag, mtime, if_range):
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return int(mtime) == int(if_range.date.timestamp())
+    return True
+
+
+def plan_file_response(path, if_none_match, if_modified_since, rng, if_range, max_age=3600):
+    """Work out ``(status, headers, start, end, size)`` for serving ``path``.
+
+    Takes the conditional and Range request headers already parsed by
+    werkzeug (as on ``flask.request``), so the WSGI and ASGI file routes
+    answer identically. 304 and 416 plans carry no body.
+    """
+    st = os.stat(path)
+    etag = file_etag(st)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if _not_modified(etag, st.st_mtime, if_none_match, if_modified_since):
+        return 304, headers, 0, 0, st.st_size
+
+    size = st.st_size
+    start, end, status = 0, size, 200
+    if rng is not None and rng.units == "bytes" and len(rng.ranges) == 1 \
+            and _range_applies(etag, st.st_mtime, if_range):
+        bounds = rng.range_for_length(size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return 416, headers, 0, 0, size
+        start, end = bounds
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    headers["Content-Length"] = str(end - start)
+    return status, headers, start, end, size
+
+
+def send_file_range(path, mimetype=None, max_age=3600):
+    """Serve ``path`` with Range, If-Range and conditional GET support.
+
+    Byte ranges are seeked to before the body is handed to the server's
+    ``wsgi.file_wrapper``, so servers that implement it with ``sendfile``
+    (gunicorn, uWSGI) copy the range in the kernel; ``Content-Length``
+    bounds the transfer to the requested range. Only single ranges are
+    honoured; multi-range requests get the whole file.
+    """
+    status, headers, start, end, size = plan_file_response(
+        path, request.if_none_match, request.if_modified_since,
+        request.range, request.if_range, max_age)
+    if status in (304, 416):
+        return Response(status=status, headers=headers)
+
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if request.method == "HEAD":
+        return Response(status=status, headers=headers, mimetype=mimetype)
+
+    f = open(path, "rb")
+    f.seek(start)
+    file_wrapper = request.environ.get("wsgi.file_wrapper")
+    if file_wrapper is not None and (end == size or _bounded_sendfile(request.environ)):
+        body = file_wrapper(f, BLOCK_SIZE)
+    else:
+        body = _read_range(f, end - start)
+    return Response(body, status=status, headers=headers, mimetype=mimetype,
+                    direct_passthrough=True)
+
+
+def _bounded_sendfile(environ):
+    # gunicorn's sendfile path stops at Content-Length, so a seeked file
+    # wrapper serves mid-file ranges exactly; other servers may read to EOF
+    return environ.get("SERVER_SOFTWARE", "").startswith("gunicorn")
+
+
+def offload_response(mode, path, internal_uri, mimetype=None):
+    """Let a front proxy send the file via X-Accel-Redirect or X-Sendfile.
+
+    The proxy handles Range and conditional requests itself.
+    """
+    headers = {"Accept-Ranges": "bytes"}
+    if mode == "x-accel-redirect":
+        headers["X-Accel-Redirect"] = internal_uri
+    else:
+        headers["X-Sendfile"] = os.path.abspath(path)
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return Response(status=200, headers=headers, mimetype=mimetype)
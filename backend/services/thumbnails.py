@@ -0,0 +1,171 @@
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FETCH_TIMEOUT = 10
+FETCH_MAX_BYTES = 10 * 1024 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; video-downloader thumbnail proxy)"
+
+# Leading bytes of the formats origins serve thumbnails in
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def thumbnail_key(extractor, video_id):
+    """Opaque id used in ``/thumbnail/<id>``; safe as a file name"""
+    return hashlib.sha1(f"{extractor}:{video_id}".encode()).hexdigest()
+
+
+def _sniff(body):
+    for signature, mimetype in SIGNATURES:
+        if body.startswith(signature):
+            return mimetype
+    if body[:4] == b"RIFF" and body[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ThumbnailCache:
+    """Proxied video thumbnails stored in a size-bounded disk cache.
+
+    ``register()`` records where a video's thumbnail lives; the first
+    ``path_for()`` fetches it once and writes one JPEG per width in
+    ``widths`` (never upscaled). Without Pillow the original image is
+    stored and served for every width. Files live in ``storage``, a
+    StorageManager whose sweeper evicts the least recently served ones.
+    """
+
+    def __init__(self, storage, widths=(160, 320, 640), quality=82):
+        self.storage = storage
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.fetches = 0
+        self.failures = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, url):
+        """Remember ``url`` as the source for ``key`` (cheap when already known)"""
+        name = f"{key}.src"
+        if self.storage.exists(name):
+            self.storage.touch(name)
+            return
+        path = self.storage.path_for(name, create=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.temp"
+        with open(tmp, "w") as f:
+            f.write(url)
+        os.replace(tmp, path)
+
+    def width_for(self, requested):
+        """Smallest stored width covering ``requested``; the largest if none does"""
+        if requested is None:
+            return self.widths[-1]
+        return next((w for w in self.widths if w >= requested), self.widths[-1])
+
+    def path_for(self, key, width):
+        """``(path, mimetype)`` of the cached image, fetching it on a miss.
+
+        Returns None for an unknown key. Concurrent misses for one key in
+        this process wait for a single fetch.
+        """
+        found = self._cached(key, width)
+        if found is not None:
+            return found
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                found = self._cached(key, width)
+                if found is not None:
+                    return found
+                source = self._source(key)
+                if source is None:
+                    return None
+                self._store(key, self._fetch(source))
+                return self._cached(key, width)
+        finally:
+            with self._lock:
+                self._locks.pop(key, None)
+
+    def _cached(self, key, width):
+        if Image is not None:
+            name, mimetype = f"{key}-{width}.jpg", "image/jpeg"
+        else:
+            name, mimetype = f"{key}.orig", None
+        if not self.storage.exists(name):
+            return None
+        self.storage.touch(name)
+        path = self.storage.path_for(name)
+        if mimetype is None:
+            with open(path, "rb") as f:
+                mimetype = _sniff(f.read(16)) or "application/octet-stream"
+        return path, mimetype
+
+    def _source(self, key):
+        try:
+            with open(self.storage.path_for(f"{key}.src")) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _fetch(self, url):
+        if not url.startswith(("http://", "https://")):
+            raise ThumbnailError("Unsupported thumbnail URL")
+        self.fetches += 1
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT) as response:
+                body = response.read(FETCH_MAX_BYTES + 1)
+        except OSError as e:
+            self.failures += 1
+            raise ThumbnailError(f"Thumbnail fetch failed: {e}") from e
+        if len(body) > FETCH_MAX_BYTES or _sniff(body) is None:
+            self.failures += 1
+            raise ThumbnailError("Thumbnail is not a supported image")
+        return body
+
+    def _store(self, key, body):
+        if Image is None:
+            self._write(f"{key}.orig", body)
+            return
+        try:
+            image = Image.open(io.BytesIO(body))
+            image.load()
+        except Exception as e:
+            self.failures += 1
+            raise ThumbnailError("Thumbnail is not a supported image") from e
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        # Largest first, so each smaller size is resampled from fewer pixels
+        for width in reversed(self.widths):
+            if width < image.width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=self.quality, optimize=True, progressive=True)
+            self._write(f"{key}-{width}.jpg", out.getvalue())
+
+    def _write(self, name, body):
+        path = self.storage.path_for(name, create=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.temp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def stats(self):
+        return {"widths": list(self.widths), "resize": Image is not None,
+                "fetches": self.fetches, "failures": self.failures}
@@ -0,0 +1,161 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_import_seconds = None
+
+
+def load_yt_dlp():
+    """Import yt-dlp on first use; its extractor registry is slow to load"""
+    global _import_seconds
+    module = sys.modules.get("yt_dlp")
+    if module is None:
+        start = time.perf_counter()
+        import yt_dlp as module
+        _import_seconds = time.perf_counter() - start
+    return module
+
+
+def yt_dlp_import_seconds():
+    """How long ``load_yt_dlp()`` took to import yt-dlp, None if not yet loaded"""
+    return _import_seconds
+
+
+class _Lease:
+    """A pooled YoutubeDL plus the per-checkout hooks routed to it"""
+
+    def __init__(self, key, ydl):
+        self.key = key
+        self.ydl = ydl
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+        self.defaults = (ydl.params.get("format"), ydl.format_selector,
+                         ydl.params["outtmpl"]["default"])
+        ydl.add_progress_hook(self._dispatch_progress)
+        ydl.add_postprocessor_hook(self._dispatch_postprocessor)
+
+    def _dispatch_progress(self, d):
+        for hook in self.progress_hooks:
+            hook(d)
+
+    def _dispatch_postprocessor(self, d):
+        for hook in self.postprocessor_hooks:
+            hook(d)
+
+    def configure(self, format=None, outtmpl=None, progress_hooks=(), postprocessor_hooks=()):
+        if format is not None:
+            self.ydl.params["format"] = format
+            self.ydl.format_selector = self.ydl.build_format_selector(format)
+        if outtmpl is not None:
+            self.ydl.params["outtmpl"]["default"] = outtmpl
+        self.progress_hooks = list(progress_hooks)
+        self.postprocessor_hooks = list(postprocessor_hooks)
+
+    def reset(self):
+        fmt, selector, outtmpl = self.defaults
+        self.ydl.params["format"] = fmt
+        self.ydl.format_selector = selector
+        self.ydl.params["outtmpl"]["default"] = outtmpl
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+
+
+class YDLPool:
+    """Pool of pre-built YoutubeDL instances keyed by option profile.
+
+    Building a YoutubeDL registers every extractor and sets up cookie jars
+    and HTTP handlers, so instances are reused across requests instead. A
+    checked-out instance belongs to one thread until it is returned; the
+    per-request options (format, output template, hooks) are applied on
+    checkout and undone on return. Instances are recycled after
+    ``max_uses`` checkouts or ``max_age`` seconds, and any instance that
+    saw an exception is discarded rather than returned.
+    """
+
+    def __init__(self, max_idle=4, max_uses=200, max_age=900, factory=None):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.factory = factory
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def acquire(self, profile, **overrides):
+        """Check out an instance for ``profile``; pair with ``release()``"""
+        key = tuple(sorted(profile.items()))
+        lease = None
+        stale = []
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and lease is None:
+                candidate = idle.pop()
+                if self._expired(candidate):
+                    stale.append(candidate)
+                else:
+                    lease = candidate
+                    self.reused += 1
+        for candidate in stale:
+            self._discard(candidate)
+        if lease is None:
+            lease = self._create(key, profile)
+        lease.uses += 1
+        lease.configure(**overrides)
+        return lease
+
+    def _create(self, key, profile):
+        factory = self.factory or load_yt_dlp().YoutubeDL
+        self.created += 1
+        return _Lease(key, factory(dict(profile)))
+
+    def warm(self, profile, count=1):
+        """Build idle instances ahead of the first request (e.g. pre-fork)"""
+        key = tuple(sorted(profile.items()))
+        leases = [self._create(key, profile) for _ in range(count)]
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.extend(leases[:max(0, self.max_idle - len(idle))])
+
+    def release(self, lease, healthy=True):
+        lease.reset()
+        with self._lock:
+            idle = self._idle.setdefault(lease.key, [])
+            if healthy and not self._expired(lease) and len(idle) < self.max_idle:
+                idle.append(lease)
+                return
+        self._discard(lease)
+
+    @contextmanager
+    def checkout(self, profile, **overrides):
+        lease = self.acquire(profile, **overrides)
+        healthy = False
+        try:
+            yield lease.ydl
+            healthy = True
+        finally:
+            self.release(lease, healthy)
+
+    def stats(self):
+        return {
+            "idle": sum(len(idle) for idle in self._idle.values()),
+            "profiles": len(self._idle),
+            "created": self.created,
+            "reused": self.reused,
+            "recycled": self.recycled,
+        }
+
+    def _expired(self, lease):
+        return (lease.uses >= self.max_uses
+                or time.monotonic() - lease.created_at > self.max_age)
+
+    def _discard(self, lease):
+        self.recycled += 1
+        try:
+            lease.ydl.close()
+        except Exception:
+            pass
@@ -119,10 +119,7 @@ async function handlePlay() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ 
-                url: videoUrlInput.value.trim(),
-                format_id: formatSelect.value 
-            })
+            body: JSON.stringify(downloadRequestBody())
         });
         
         let data;
@@ -152,6 +149,10 @@ async function handlePlay() {
             return;
         }
         
+        // Downloads run in the background; wait for the job to finish
+        if (data.status !== 'done') {
+            data = await waitForJob(data.status_url);
+        }
         currentDownloadedFile = data.filename;
         
         // Set video source and show player
@@ -180,10 +181,7 @@ async function handleConfirmDownload() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ 
-                url: videoUrlInput.value.trim(),
-                format_id: formatSelect.value 
-            })
+            body: JSON.stringify(downloadRequestBody())
         });
         
         let data;
@@ -213,6 +211,11 @@ async function handleConfirmDownload() {
             return;
         }
         
+        // Downloads run in the background; wait for the job to finish
+        if (data.status !== 'done') {
+            data = await waitForJob(data.status_url);
+        }
+        
         // Trigger download
         const downloadUrl = data.download_url;
         const link = document.createElement('a');
@@ -241,19 +244,24 @@ function displayVideoInfo(info) {
     
     if (info.thumbnail) {
         videoThumbnail.src = info.thumbnail;
+        // Let the browser pick the smallest proxied size that fills the card
+        videoThumbnail.srcset = (info.thumbnails || [])
+            .filter(t => t.width)
+            .map(t => `${t.url} ${t.width}w`).join(', ');
+        videoThumbnail.sizes = '(max-width: 768px) 100vw, 50vw';
         videoThumbnail.alt = info.title;
     }
     
-    // Populate format options
+    // Populate quality options from the precomputed format ladder
     formatSelect.innerHTML = '<option value="best">Best Quality</option>';
-    if (info.formats && info.formats.length > 0) {
-        info.formats.forEach(format => {
-            if (format.quality && format.quality !== 'Unknown') {
-                const option = document.createElement('option');
-                option.value = format.format_id;
-                option.textContent = `${format.quality}p (${format.ext.toUpperCase()})`;
-                formatSelect.appendChild(option);
-            }
+    if (info.ladder && info.ladder.length > 0) {
+        info.ladder.forEach(rung => {
+            const option = document.createElement('option');
+            option.value = rung.key;
+            const label = rung.key === 'audio' ? 'Audio only' : rung.key;
+            const size = rung.filesize ? `, ~${formatSize(rung.filesize)}` : '';
+            option.textContent = `${label} (${(rung.ext || '').toUpperCase()}${size})`;
+            formatSelect.appendChild(option);
         });
     }
     
@@ -338,6 +346,81 @@ async function showSupportedSites() {
     }
 }
 
+// Follow a download job's progress events until it finishes; falls back
+// to polling the job when the server cannot hold an event stream open
+function waitForJob(statusUrl) {
+    return new Promise((resolve, reject) => {
+        const settle = (job) => {
+            showJobProgress(job);
+            if (job.status === 'done') {
+                resolve(job);
+            } else if (job.status === 'failed' || job.status === 'cancelled') {
+                reject(new Error(job.error || `Download ${job.status}`));
+            } else {
+                return false;
+            }
+            return true;
+        };
+
+        const poll = async () => {
+            try {
+                const response = await fetch(statusUrl);
+                if (!response.ok) {
+                    throw new Error('Lost track of the download');
+                }
+                if (!settle(await response.json())) {
+                    setTimeout(poll, 1000);
+                }
+            } catch (error) {
+                reject(error);
+            }
+        };
+
+        if (!window.EventSource) {
+            poll();
+            return;
+        }
+
+        const events = new EventSource(`${statusUrl}/events`);
+        events.addEventListener('progress', (e) => {
+            if (settle(JSON.parse(e.data))) {
+                events.close();
+            }
+        });
+        events.onerror = () => {
+            // EventSource reconnects on its own unless the stream was refused
+            if (events.readyState === EventSource.CLOSED) {
+                poll();
+            }
+        };
+    });
+}
+
+// Show download progress in the loading state
+function showJobProgress(job) {
+    const label = loadingState.querySelector('p');
+    if (job.stage === 'postprocessing') {
+        label.textContent = 'Finishing up your video...';
+    } else if (job.total_bytes) {
+        const percent = Math.floor(job.downloaded_bytes / job.total_bytes * 100);
+        const eta = job.eta != null ? ` • ${formatDuration(job.eta)} left` : '';
+        label.textContent = `Downloading... ${percent}%${eta}`;
+    } else if (job.status === 'queued') {
+        label.textContent = 'Waiting for a free download slot...';
+    }
+}
+
+// Build the /download request for the selected quality
+function downloadRequestBody() {
+    const body = { url: videoUrlInput.value.trim() };
+    if (formatSelect.value === 'best') {
+        body.format_id = 'best';
+    } else {
+        body.quality = formatSelect.value;
+    }
+    return body;
+}
+
 // Utility functions
 function isValidUrl(string) {
     try {
@@ -362,6 +445,16 @@ function formatDuration(seconds) {
     }
 }
 
+function formatSize(bytes) {
+    if (bytes >= 1024 * 1024 * 1024) {
+        return `${(bytes / (1024 * 1024 * 1024)).toFixed(1)} GB`;
+    } else if (bytes >= 1024 * 1024) {
+        return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+    } else {
+        return `${Math.max(1, Math.round(bytes / 1024))} KB`;
+    }
+}
+
 function formatViews(views) {
     if (!views) return 'Unknown views';
     
@@ -381,6 +474,7 @@ function showLoading() {
 
 function hideLoading() {
     loadingState.classList.add('hidden');
+    loadingState.querySelector('p').textContent = 'Processing your video...';
 }
 
 function showError(message) {